@@ -0,0 +1,516 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime
+from itertools import chain, repeat
+
+from twitter_supporter_analyzer import TwitterSupporterAnalyzer
+from report_writer import write_report, write_variants
+from report_index import index_report
+from instrumentation import metrics
+from near_duplicates import NearDuplicateIndex
+from snapshot_store import rank_by_velocity
+from targets import load_targets
+from tweet_classifier import iter_sections
+from tweet_record import TopK, engagement_key, relevance_key
+
+
+class TweepySource:
+    """Twitter API v2（tweepy）からの収集"""
+    name = 'API v2'
+
+    def __init__(self, analyzer, days_back=7):
+        self.analyzer = analyzer
+        self.days_back = days_back
+
+    def stream(self):
+        # tweepyは同期APIなので別スレッドで読み進める
+        return iterate_in_thread(lambda: self.analyzer.iter_viral_tweets(self.days_back))
+
+
+class TwikitSource:
+    """twikitからの収集"""
+    name = 'Twikit'
+
+    def __init__(self, analyzer, days_back=7):
+        self.analyzer = analyzer
+        self.days_back = days_back
+        # 常駐モードでは2回目以降のログインを省略する
+        self.logged_in = False
+
+    async def stream(self):
+        if not self.logged_in:
+            self.logged_in = await self.analyzer.login_twitter()
+            if not self.logged_in:
+                print("ログインに失敗しました")
+                return
+        try:
+            async for tweet in self.analyzer.iter_all_tweets(self.days_back):
+                yield tweet
+        except Exception:
+            # セッション切れの可能性があるので次回はログインし直す
+            self.logged_in = False
+            raise
+
+
+class AnalysisPipeline:
+    """複数の収集元を並行実行し、届いた順に重複除外・関連度判定して上位だけを保持する"""
+
+    def __init__(self, sources, analyzer, display_limit=20, max_relevant=500, ranking='engagement', days_back=7):
+        # analyzer: 関連度フィルタリングとAI分類に使うTwitterSupporterAnalyzer
+        # max_relevant: AI分類・レポートに使う関連ツイートの上限（関連度順の上位）
+        # ranking: 候補ツイートの表示順（'engagement' または直近の伸び順の 'velocity'）
+        self.sources = sources
+        self.analyzer = analyzer
+        self.display_limit = display_limit
+        self.max_relevant = max_relevant
+        self.ranking = ranking
+        self.days_back = days_back
+
+    async def stream(self):
+        """全収集元を並行に読み、届いた順に (収集元, ツイート) を返す"""
+        queue = asyncio.Queue(maxsize=1000)
+
+        async def drain(source):
+            stream = source.stream()
+            try:
+                async for tweet in stream:
+                    await queue.put((source, tweet))
+            except Exception as e:
+                print(f"{source.name} 収集エラー: {e}")
+            finally:
+                # 読み手がやめて取り消されたときも収集元（別スレッドの収集）を止める
+                await stream.aclose()
+            await queue.put((source, None))
+
+        tasks = [asyncio.ensure_future(drain(source)) for source in self.sources]
+        remaining = len(tasks)
+        try:
+            while remaining:
+                source, tweet = await queue.get()
+                if tweet is None:
+                    remaining -= 1
+                    continue
+                yield source, tweet
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def rank(self):
+        """重複除外 → 類似ツイートの集約 → 関連度判定 → 上位max_relevant件の選抜を1件ずつ行う
+
+        戻り値は (関連度順の上位ツイート, 収集元ごとの件数, 重複除外後の件数, 関連ツイート数)
+        """
+        source_counts = {source.name: 0 for source in self.sources}
+        seen_ids = set()
+        ranker = TargetRanker(self.analyzer.target, self.max_relevant)
+        archive = self.analyzer.tweet_archive
+        snapshot_store = self.analyzer.snapshot_store
+        pending_relevance = []
+
+        async for source, tweet in self.stream():
+            source_counts[source.name] += 1
+            tweet_id = int(tweet['tweet_id'])
+            if tweet_id in seen_ids:
+                continue
+            seen_ids.add(tweet_id)
+            # 関連度判定・類似ツイートの合算の前に、収集したままの値をアーカイブに写し取る
+            # （常駐モードでエンゲージメントを更新しなかった引き継ぎ分は前回と同じ値なので記録しない）
+            if tweet_id in snapshot_store.observed_ids:
+                archive.add(tweet)
+            if ranker.add(tweet):
+                # 関連度はまとめてストアに保存
+                pending_relevance.append(tweet)
+                if len(pending_relevance) >= 500:
+                    self.analyzer.tweet_store.update_relevance(pending_relevance)
+                    pending_relevance = []
+        self.analyzer.tweet_store.update_relevance(pending_relevance)
+        archive.flush()
+
+        if ranker.near_duplicates.merged_count:
+            print(f"類似ツイートを集約: {ranker.near_duplicates.merged_count}件")
+        return ranker.ranked(), source_counts, len(seen_ids), ranker.relevant_count
+
+    def ranked_ids(self, ranking):
+        """rank() の結果の上位ツイートのID（常駐モードで前回と比べる）"""
+        return [tweet['tweet_id'] for tweet in ranking[0]]
+
+    async def run(self):
+        """収集・分析・レポート出力"""
+        metrics.reset()
+        print("=== ツイート収集開始 ===")
+        with metrics.stage('collect_and_rank'):
+            ranked = await self.rank()
+        return self.report(*ranked)
+
+    def report(self, relevant_tweets, source_counts, total_count, relevant_count):
+        """rank() の結果をAI分類してレポートを書き出し、HTMLのパスを返す"""
+        target = self.analyzer.target
+        for name, count in source_counts.items():
+            print(f"  {name}: {count}件")
+        print(f"重複除外後: {total_count}件")
+        print(f"{target.name}関連: {relevant_count}件（上位{len(relevant_tweets)}件を分析）")
+
+        print("AI分析を実行中...")
+        analysis = self.analyzer.analyze_tweets_with_ai(relevant_tweets, filtered=True)
+        velocities = self.analyzer.snapshot_store.velocities(self.days_back) if self.ranking == 'velocity' else None
+        report_name, title, html_path = render_report(
+            target, relevant_tweets, analysis, source_counts, total_count, relevant_count,
+            self.ranking, velocities, self.display_limit
+        )
+        print(f"レポートを生成しました: {html_path}")
+        index_report(report_name, title, html_path, relevant_tweets)
+        metrics.write_manifest(
+            f'reports/{report_name}.manifest.json',
+            report=report_name,
+            source_counts=source_counts,
+            tweets={'unique': total_count, 'relevant': relevant_count, 'analyzed': len(relevant_tweets)}
+        )
+        return html_path
+
+
+class TargetRanker:
+    """1つの監視対象について、届いたツイートを類似ツイートの集約 → 関連度判定 → 上位max_relevant件の選抜にかける"""
+
+    def __init__(self, target, max_relevant=500):
+        self.target = target
+        self.near_duplicates = NearDuplicateIndex()
+        self.relevant = TopK(max_relevant, relevance_key)
+        # 関連ツイートが1件もないときはエンゲージメント上位を代わりに使う
+        self.fallback = TopK(max_relevant, engagement_key)
+        # この対象で関連と判定した代表のtweet_id（レコードの関連度は他の対象・前回の値のことがある）
+        self._relevant_ids = set()
+        self.relevant_count = 0
+
+    def add(self, tweet):
+        """1件追加（新しく関連ツイートと判定したらTrue）"""
+        # ほぼ同じ本文のツイートは最初の1件に合算し、その順位だけ更新
+        representative, is_new = self.near_duplicates.add(tweet)
+        if not is_new:
+            (self.relevant if representative['tweet_id'] in self._relevant_ids else self.fallback).push(representative)
+            return False
+        if self.target.score_relevance(tweet):
+            self._relevant_ids.add(tweet['tweet_id'])
+            self.relevant_count += 1
+            self.relevant.push(tweet)
+            return True
+        self.fallback.push(tweet)
+        return False
+
+    def ranked(self):
+        """関連度順の上位ツイート（関連ツイートがなければエンゲージメント順）"""
+        return self.relevant.ranked() if self.relevant_count else self.fallback.ranked()
+
+
+class MultiTargetPipeline(AnalysisPipeline):
+    """複数の監視対象をまとめて処理する
+
+    収集は全対象分を1回だけ行い（クエリ・アカウントは重複なし）、対象ごとの関連度判定とレポート出力は
+    プロセスプールで並列に行う。AI分類は全対象の上位ツイートをまとめて1回だけ行う。
+    rank()・report()・ranked_ids() は AnalysisPipeline と同じ使い方なので、WatchDaemon からも使える。
+    """
+
+    def __init__(self, sources, analyzer, targets, max_workers=None, **options):
+        # max_workers: プロセス数（省略時は監視対象の数とCPU数の小さい方）
+        super().__init__(sources, analyzer, **options)
+        self.targets = targets
+        self.max_workers = max_workers or min(len(targets), os.cpu_count() or 1)
+
+    async def rank(self):
+        """全対象分を1回だけ収集し、対象ごとの関連度判定をプロセスプールで行う
+
+        戻り値は (対象ごとの (上位ツイート, 関連ツイート数, 集約件数) のリスト, 収集元ごとの件数, 重複除外後の件数)
+        """
+        tweets, source_counts = await self.collect_unique()
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            outputs = list(executor.map(
+                rank_target, self.targets, repeat(tweets), repeat(self.max_relevant)
+            ))
+        results = []
+        store = self.analyzer.tweet_store
+        for i, (target, output) in enumerate(zip(self.targets, outputs)):
+            relevant_tweets, relevant_count, merged_count, relevance_rows, worker_metrics = output
+            metrics.merge(worker_metrics)
+            # 関連度は対象ごとの表に保存し、先頭の対象は従来どおりツイートの列にも保存（generate_report と同じ）
+            store.save_relevance(relevance_rows, target.slug)
+            if i == 0:
+                store.save_relevance(relevance_rows)
+            results.append((relevant_tweets, relevant_count, merged_count))
+        return results, source_counts, len(tweets)
+
+    def ranked_ids(self, ranking):
+        return [[tweet['tweet_id'] for tweet in relevant_tweets] for relevant_tweets, _, _ in ranking[0]]
+
+    def report(self, results, source_counts, total_count):
+        """rank() の結果をまとめてAI分類し、対象ごとのレポートをプロセスプールで書き出す（HTMLのパスのリストを返す）"""
+        for name, count in source_counts.items():
+            print(f"  {name}: {count}件")
+        print(f"重複除外後: {total_count}件")
+        for target, (relevant_tweets, relevant_count, merged_count) in zip(self.targets, results):
+            print(f"{target.name}関連: {relevant_count}件（上位{len(relevant_tweets)}件を分析、類似ツイートを集約: {merged_count}件）")
+
+        print("AI分析を実行中...")
+        categories, error = self.classify_all([relevant_tweets for relevant_tweets, _, _ in results])
+        # 分野は検索インデックスにも載せるので親プロセス側で付ける
+        for relevant_tweets, _, _ in results:
+            for tweet in relevant_tweets:
+                tweet['category'] = categories.get(tweet['tweet_id'], 'その他')
+        velocities = self.analyzer.snapshot_store.velocities(self.days_back) if self.ranking == 'velocity' else None
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            outputs = list(executor.map(
+                render_target_report, self.targets, [result[0] for result in results],
+                repeat(categories), repeat(error), repeat(source_counts), repeat(total_count),
+                [result[1] for result in results], repeat(self.ranking), repeat(velocities),
+                repeat(self.display_limit)
+            ))
+        reports = []
+        for report, worker_metrics in outputs:
+            metrics.merge(worker_metrics)
+            reports.append(report)
+
+        html_paths = []
+        for target, (relevant_tweets, relevant_count, _), (report_name, title, html_path) in zip(self.targets, results, reports):
+            print(f"レポートを生成しました: {html_path}")
+            index_report(report_name, title, html_path, relevant_tweets)
+            metrics.write_manifest(
+                f'reports/{report_name}.manifest.json',
+                report=report_name,
+                target=target.name,
+                source_counts=source_counts,
+                tweets={'unique': total_count, 'relevant': relevant_count, 'analyzed': len(relevant_tweets)}
+            )
+            html_paths.append(html_path)
+        return html_paths
+
+    async def collect_unique(self):
+        """全収集元を並行に読み、tweet_idで重複を除いた一覧と収集元ごとの件数を返す"""
+        source_counts = {source.name: 0 for source in self.sources}
+        archive = self.analyzer.tweet_archive
+        snapshot_store = self.analyzer.snapshot_store
+        tweets = {}
+        async for source, tweet in self.stream():
+            source_counts[source.name] += 1
+            tweet_id = int(tweet['tweet_id'])
+            if tweet_id not in tweets:
+                tweets[tweet_id] = tweet
+                # 今回取得・更新した値をアーカイブに写し取る（rank() と同じ）
+                if tweet_id in snapshot_store.observed_ids:
+                    archive.add(tweet)
+        archive.flush()
+        return list(tweets.values()), source_counts
+
+    def classify_all(self, tweet_lists):
+        """全対象の上位ツイートをまとめて分類（(tweet_id → 分野, エラーメッセージ) を返す）"""
+        unique = list({tweet['tweet_id']: tweet for tweets in tweet_lists for tweet in tweets}.values())
+        try:
+            return self.analyzer.tweet_classifier.classify(unique), None
+        except Exception as e:
+            return {}, f"AI分析エラー: {e}"
+
+
+def rank_target(target, tweets, max_relevant):
+    """プロセスプールで実行する1対象分の関連度判定
+
+    戻り値は (上位ツイート, 関連ツイート数, 集約件数, 全関連ツイートの (関連度, tweet_id), このプロセスの集計)
+    """
+    # プロセスは使い回されるので、集計はタスクごとにやり直して親に返す
+    metrics.reset()
+    ranker = TargetRanker(target, max_relevant)
+    relevance_rows = []
+    with metrics.stage('rank_target'):
+        for tweet in tweets:
+            if ranker.add(tweet):
+                relevance_rows.append((tweet['relevance_score'], int(tweet['tweet_id'])))
+    return (ranker.ranked(), ranker.relevant_count, ranker.near_duplicates.merged_count,
+            relevance_rows, metrics.snapshot())
+
+
+def render_target_report(target, relevant_tweets, categories, error, source_counts, total_count, relevant_count,
+                         ranking, velocities, display_limit):
+    """プロセスプールで実行する1対象分のレポート出力（戻り値は ((レポート名, タイトル, HTMLのパス), このプロセスの集計)）"""
+    metrics.reset()
+    if error:
+        analysis = [f"{error}\n\n"]
+    elif not relevant_tweets:
+        analysis = ["本日はバイラルツイートはありませんでした。\n\n"]
+    else:
+        analysis = iter_sections(relevant_tweets, categories)
+    report = render_report(
+        target, relevant_tweets, analysis, source_counts, total_count, relevant_count,
+        ranking, velocities, display_limit
+    )
+    return report, metrics.snapshot()
+
+
+def render_report(target, relevant_tweets, analysis, source_counts, total_count, relevant_count,
+                  ranking='engagement', velocities=None, display_limit=20):
+    """本体と分野別・日別のレポートを断片ごとに書き出す（戻り値は (レポート名, タイトル, HTMLのパス)）"""
+    report_date = datetime.now().strftime('%Y-%m-%d')
+    report_name = target.report_name(report_date)
+    title = f'{target.name + " " if target.slug else ""}支援者ツイート分析レポート - {report_date}'
+    source_lines = "\n".join(f"- 📥 {name}: {count}件" for name, count in source_counts.items())
+    header = f"""# 🔍 {target.name}関連ツイート拾い上げ
+## {report_date}
+
+### 📈 収集状況
+{source_lines}
+- 📊 注目ツイート総数（重複除外後）: {total_count}件
+- 🎯 関連ツイート: {relevant_count}件
+
+"""
+    candidates_heading = f"""---
+
+## 🔥 リポスト・ウォッチ候補ツイート
+*関連度・{'直近の伸び' if ranking == 'velocity' else 'エンゲージメント'}が高い順に表示（クリックでXへ移動）*
+
+"""
+    if ranking == 'velocity':
+        display_tweets = rank_by_velocity(relevant_tweets, velocities, limit=display_limit)
+    else:
+        # 関連度順（同点はエンゲージメント順）に並んでいる
+        display_tweets = relevant_tweets[:display_limit]
+
+    variant_links = write_variants(report_name, title, relevant_tweets)
+    html_path = write_report(
+        report_name, title, chain([header], analysis, [variant_links, candidates_heading]), display_tweets
+    )
+    return report_name, title, html_path
+
+
+async def iterate_in_thread(make_iterator, buffer_size=1000, put_timeout=1.0):
+    """同期ジェネレーターを別スレッドで読み進め、非同期ジェネレーターとして返す
+
+    読み手が途中でやめた（例外・break）ときは、書き手のスレッドも次の1件で止まる。
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=buffer_size)
+    done = object()
+    stopped = threading.Event()
+
+    def put(item):
+        """キューに入れる（読み手がやめていたら待つのをやめてFalse）"""
+        future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        while True:
+            try:
+                future.result(timeout=put_timeout)
+                return True
+            except FutureTimeoutError:
+                if stopped.is_set():
+                    future.cancel()
+                    return False
+
+    def produce():
+        try:
+            for item in make_iterator():
+                if stopped.is_set() or not put(item):
+                    return
+        finally:
+            if not stopped.is_set():
+                put(done)
+
+    producer = asyncio.ensure_future(asyncio.to_thread(produce))
+    # 読み手がやめた後の収集中の例外は、待つ人がいないので捨てる
+    producer.add_done_callback(lambda future: future.cancelled() or future.exception())
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            yield item
+    finally:
+        stopped.set()
+    # 収集中の例外はここで呼び出し元に伝わる
+    await producer
+
+
+class WatchDaemon:
+    """クライアント・キャッシュ・ログインを保持したまま一定間隔で収集し、上位ツイートが変わったときだけレポートを書き出す
+
+    収集はウォーターマークによる差分取得なので、2回目以降は新しいツイートの分だけリクエストする。
+    """
+
+    def __init__(self, pipeline, interval=900, max_polls=None):
+        # interval: 収集を始める間隔（秒）
+        # max_polls: 収集の回数の上限（指定しなければ止めるまで続ける）
+        self.pipeline = pipeline
+        self.interval = interval
+        self.max_polls = max_polls
+        self._ranked_ids = None
+
+    async def run(self):
+        polls = 0
+        while self.max_polls is None or polls < self.max_polls:
+            started = time.monotonic()
+            try:
+                await self.poll()
+            except Exception as e:
+                print(f"監視中のエラー: {e}")
+            polls += 1
+            if self.max_polls is None or polls < self.max_polls:
+                await asyncio.sleep(max(self.interval - (time.monotonic() - started), 0))
+
+    async def poll(self):
+        """1回分の収集（レポートを書き出したらそのHTMLのパス、変化がなければNone）"""
+        metrics.reset()
+        self.pipeline.analyzer.snapshot_store.start_run()
+        print(f"=== ツイート収集開始 ({datetime.now().strftime('%H:%M:%S')}) ===")
+        with metrics.stage('collect_and_rank'):
+            ranked = await self.pipeline.rank()
+        ranked_ids = self.pipeline.ranked_ids(ranked)
+        if ranked_ids == self._ranked_ids:
+            print("上位ツイートに変化がないため、レポートは更新しません")
+            return None
+        self._ranked_ids = ranked_ids
+        return self.pipeline.report(*ranked)
+
+
+def build_sources(analyzer):
+    """認証情報が設定されている収集元だけを使う"""
+    sources = []
+    if os.getenv('TWITTER_BEARER_TOKEN'):
+        sources.append(TweepySource(analyzer))
+    if os.getenv('TWITTER_USERNAME'):
+        # twikitは使うときだけ読み込む（起動を速くするため）
+        from twitter_twikit_analyzer import TwitterTwikitAnalyzer
+        sources.append(TwikitSource(TwitterTwikitAnalyzer(
+            user_cache=analyzer.user_cache, snapshot_store=analyzer.snapshot_store,
+            engagement_refresh_interval=analyzer.engagement_refresh_interval, targets=analyzer.targets,
+            tweet_archive=analyzer.tweet_archive
+        )))
+    return sources
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='支援者ツイートを収集・分析してレポートを出力')
+    # REPORT_RANKING=velocity で候補ツイートを直近の伸び順に表示
+    parser.add_argument('--ranking', choices=['engagement', 'velocity'], default=os.getenv('REPORT_RANKING', 'engagement'),
+                        help='候補ツイートの表示順')
+    parser.add_argument('--watch', action='store_true', help='常駐して一定間隔で収集し、上位が変わったらレポートを更新')
+    parser.add_argument('--interval', type=float, default=float(os.getenv('WATCH_INTERVAL', 900)),
+                        help='常駐モードで収集する間隔（秒）')
+    parser.add_argument('--refresh-interval', type=float, default=float(os.getenv('WATCH_REFRESH_INTERVAL', 3600)),
+                        help='常駐モードで取得済みツイートのエンゲージメントを更新する間隔（秒）')
+    parser.add_argument('--targets', default='targets.json', help='監視対象の設定ファイル（なければ山田太郎議員のみ）')
+    args = parser.parse_args(argv)
+
+    targets = load_targets(args.targets)
+    analyzer = TwitterSupporterAnalyzer(
+        engagement_refresh_interval=args.refresh_interval if args.watch else 0, targets=targets
+    )
+    if len(targets) > 1:
+        # 複数の監視対象は収集を共有し、対象ごとのレポートをプロセスプールで出力
+        pipeline = MultiTargetPipeline(build_sources(analyzer), analyzer, targets, ranking=args.ranking)
+    else:
+        pipeline = AnalysisPipeline(build_sources(analyzer), analyzer, ranking=args.ranking)
+    if args.watch:
+        asyncio.run(WatchDaemon(pipeline, interval=args.interval).run())
+    else:
+        asyncio.run(pipeline.run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+import random
+import time
+from datetime import datetime, timezone
+
+# 合成ツイートの材料（関連キーワードを含む断片と含まない断片）
+RELEVANT_FRAGMENTS = [
+    '山田太郎議員の国会質問', '表現の自由を守る', '著作権法の改正案', 'クリエイターの権利',
+    'デジタル庁の取り組み', 'マイナンバーカードの件', '非実在青少年の規制', 'AI規制の議論',
+    'マンガとアニメの未来', '同人誌即売会', '参議院の委員会', '自民党の政策',
+]
+OTHER_FRAGMENTS = [
+    '今日はいい天気', 'ランチはラーメン', '電車が遅れている', '新しい本を買った',
+    '週末は散歩', 'コーヒーがおいしい', '仕事が忙しい', '猫がかわいい',
+    '映画を観に行った', '雨が降ってきた', '早起きした', '部屋の掃除',
+]
+ENDINGS = ['。', '！', 'ですね。', 'と思う。', '…', '🙏', '👍', '']
+
+TWITTER_EPOCH_MS = 1288834974657
+
+
+def snowflake_id(timestamp, sequence):
+    """投稿時刻からtweet_idを作る（上位ビットが時刻になる本物と同じ形式）"""
+    return ((int(timestamp * 1000) - TWITTER_EPOCH_MS) << 22) | (sequence & 0x3FFFFF)
+
+
+class Corpus:
+    """ベンチマーク用の合成アカウントとツイート"""
+
+    def __init__(self, n_tweets, n_accounts=100, days_back=7, relevant_ratio=0.3, seed=0):
+        rng = random.Random(seed)
+        now = time.time() - 60
+        self.accounts = [
+            {
+                'id': str(10_000 + i),
+                'username': f'bench_user{i}',
+                'name': f'ベンチ{i}',
+                'followers_count': rng.randint(100, 50_000),
+                'following_count': rng.randint(50, 2_000),
+                'tweet_count': rng.randint(100, 20_000),
+            }
+            for i in range(n_accounts)
+        ]
+        self.accounts_by_id = {account['id']: account for account in self.accounts}
+        self.accounts_by_name = {account['username'].lower(): account for account in self.accounts}
+
+        self.tweets = []
+        for i in range(n_tweets):
+            fragments = RELEVANT_FRAGMENTS if rng.random() < relevant_ratio else OTHER_FRAGMENTS
+            text = ''.join(rng.choice(fragments) + rng.choice(ENDINGS) for _ in range(rng.randint(1, 4)))
+            timestamp = now - rng.random() * days_back * 86400
+            self.tweets.append({
+                'id': str(snowflake_id(timestamp, i)),
+                'author_id': rng.choice(self.accounts)['id'],
+                'text': text,
+                'created_at': datetime.fromtimestamp(timestamp, timezone.utc),
+                'like_count': int(rng.expovariate(0.3)),
+                'retweet_count': int(rng.expovariate(0.8)),
+                'reply_count': int(rng.expovariate(1.0)),
+            })
+        # 新しい順（APIの返却順）
+        self.tweets.sort(key=lambda tweet: int(tweet['id']), reverse=True)
+        self.tweets_by_id = {tweet['id']: tweet for tweet in self.tweets}
+        self.tweets_by_author = {}
+        for tweet in self.tweets:
+            self.tweets_by_author.setdefault(tweet['author_id'], []).append(tweet)
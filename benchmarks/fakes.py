@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import re
+import threading
+import time
+from types import SimpleNamespace
+from urllib.parse import urlparse
+
+from twikit.errors import TooManyRequests
+
+from rate_limiter import endpoint_key
+
+
+class RateWindow:
+    """エンドポイントごとに window 秒あたり limit 回までのレート制限（limit=Noneなら無制限）"""
+
+    def __init__(self, limit=None, window=1.0):
+        self.limit = limit
+        self.window = window
+        self._windows = {}
+        self._lock = threading.Lock()
+        self.limited_count = 0
+
+    def take(self, key):
+        """(許可されたか, 残り回数, リセット時刻) を返す"""
+        now = time.time()
+        with self._lock:
+            reset, used = self._windows.get(key, (now + self.window, 0))
+            if now >= reset:
+                reset, used = now + self.window, 0
+            if self.limit is not None and used >= self.limit:
+                self.limited_count += 1
+                return False, 0, reset
+            self._windows[key] = (reset, used + 1)
+            remaining = self.limit - used - 1 if self.limit is not None else 1_000_000
+            return True, remaining, reset
+
+
+class FakeResponse:
+    """tweepyが使う範囲の requests.Response 互換オブジェクト"""
+
+    def __init__(self, status_code, body, headers):
+        self.status_code = status_code
+        self.reason = 'OK' if status_code == 200 else 'Too Many Requests'
+        self.headers = headers
+        self.content = json.dumps(body).encode('utf-8')
+        self._body = body
+
+    def json(self):
+        return self._body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeTwitterSession:
+    """tweepy.Client.session の代わりにAPI v2の応答を合成する
+
+    tweepy.Client（RateLimitedClient）の session を差し替えて使うので、
+    パラメータ変換・応答の解析・レート制限の処理は本物と同じ経路を通る。
+    """
+
+    def __init__(self, corpus, latency=0.0, rate_limit=None, rate_window=1.0):
+        self.corpus = corpus
+        self.latency = latency
+        self.rate_window = RateWindow(rate_limit, rate_window)
+        self.request_count = 0
+
+    def request(self, method, url, params=None, json=None, headers=None, auth=None):
+        self.request_count += 1
+        if self.latency:
+            time.sleep(self.latency)
+        route = urlparse(url).path
+        allowed, remaining, reset = self.rate_window.take(endpoint_key(method, route))
+        rate_headers = {
+            'x-rate-limit-limit': str(self.rate_window.limit or 1_000_000),
+            'x-rate-limit-remaining': str(remaining),
+            'x-rate-limit-reset': str(int(reset) + 1),
+        }
+        if not allowed:
+            return FakeResponse(429, {'title': 'Too Many Requests', 'detail': 'Too Many Requests'}, rate_headers)
+        return FakeResponse(200, self.handle(route, params or {}), rate_headers)
+
+    def handle(self, route, params):
+        parts = route.strip('/').split('/')
+        if parts[1:2] == ['users'] and parts[3:] == ['followers']:
+            return self.followers(params)
+        if parts[1:2] == ['users'] and parts[3:] == ['tweets']:
+            return self.page(self.corpus.tweets_by_author.get(parts[2], []), params, 'pagination_token')
+        if parts[1:] == ['tweets', 'search', 'recent']:
+            return self.page(self.search(params['query']), params, 'next_token')
+        if parts[1:] == ['tweets']:
+            ids = params['ids'].split(',')
+            return {'data': [self.tweet_json(self.corpus.tweets_by_id[tweet_id])
+                             for tweet_id in ids if tweet_id in self.corpus.tweets_by_id]}
+        raise ValueError(f"Unsupported route: {route}")
+
+    def followers(self, params):
+        offset = int(params.get('pagination_token') or 0)
+        size = int(params.get('max_results', 100))
+        users = self.corpus.accounts[offset:offset + size]
+        body = {
+            'data': [self.user_json(account) for account in users],
+            'meta': {'result_count': len(users)}
+        }
+        if offset + size < len(self.corpus.accounts):
+            body['meta']['next_token'] = str(offset + size)
+        return body
+
+    def search(self, query):
+        """from:演算子とキーワード（ORでつないだAND条件）だけを解釈する"""
+        usernames = re.findall(r'from:(\w+)', query)
+        if usernames:
+            tweets = []
+            for username in usernames:
+                account = self.corpus.accounts_by_name.get(username.lower())
+                if account:
+                    tweets.extend(self.corpus.tweets_by_author.get(account['id'], []))
+            return sorted(tweets, key=lambda tweet: int(tweet['id']), reverse=True)
+        query = re.sub(r'-?\w+:\S+', '', query).replace('(', ' ').replace(')', ' ')
+        groups = [group.split() for group in query.split(' OR ') if group.strip()]
+        return [
+            tweet for tweet in self.corpus.tweets
+            if any(all(term in tweet['text'] for term in group) for group in groups)
+        ]
+
+    def page(self, tweets, params, token_name):
+        since_id = int(params.get('since_id') or 0)
+        start_time = params.get('start_time')
+        if since_id or start_time:
+            tweets = [
+                tweet for tweet in tweets
+                if int(tweet['id']) > since_id and (not start_time or tweet['created_at'].isoformat() >= start_time[:19])
+            ]
+        offset = int(params.get(token_name) or 0)
+        size = int(params.get('max_results', 10))
+        chunk = tweets[offset:offset + size]
+        body = {
+            'data': [self.tweet_json(tweet) for tweet in chunk],
+            'meta': {'result_count': len(chunk)}
+        }
+        if 'author_id' in params.get('expansions', ''):
+            authors = {tweet['author_id'] for tweet in chunk}
+            body['includes'] = {'users': [self.user_json(self.corpus.accounts_by_id[user_id]) for user_id in authors]}
+        if offset + size < len(tweets):
+            body['meta']['next_token'] = str(offset + size)
+        if not chunk:
+            del body['data']
+        return body
+
+    @staticmethod
+    def tweet_json(tweet):
+        return {
+            'id': tweet['id'],
+            'edit_history_tweet_ids': [tweet['id']],
+            'author_id': tweet['author_id'],
+            'text': tweet['text'],
+            'created_at': tweet['created_at'].strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+            'public_metrics': {
+                'like_count': tweet['like_count'],
+                'retweet_count': tweet['retweet_count'],
+                'reply_count': tweet['reply_count'],
+                'quote_count': 0,
+            }
+        }
+
+    @staticmethod
+    def user_json(account):
+        return {
+            'id': account['id'],
+            'username': account['username'],
+            'name': account['name'],
+            'verified': False,
+            'public_metrics': {
+                'followers_count': account['followers_count'],
+                'following_count': account['following_count'],
+                'tweet_count': account['tweet_count'],
+                'listed_count': 0,
+            }
+        }
+
+
+class FakeTwikitResult(list):
+    """twikitのResult互換（next()で次のページ）"""
+
+    def __init__(self, items, fetch_next=None):
+        super().__init__(items)
+        self._fetch_next = fetch_next
+
+    async def next(self):
+        if self._fetch_next is None:
+            return FakeTwikitResult([])
+        return await self._fetch_next()
+
+
+class FakeTwikitClient:
+    """twikit.Client の代わりに合成ツイートを返す"""
+
+    def __init__(self, corpus, latency=0.0, rate_limit=None, rate_window=1.0):
+        self.corpus = corpus
+        self.latency = latency
+        self.rate_window = RateWindow(rate_limit, rate_window)
+        self.request_count = 0
+
+    async def _call(self, key):
+        self.request_count += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        allowed, _, reset = self.rate_window.take(key)
+        if not allowed:
+            raise TooManyRequests('Rate limit exceeded', headers={'x-rate-limit-reset': str(int(reset) + 1)})
+
+    async def login(self, **kwargs):
+        await self._call('login')
+
+    def load_cookies(self, path):
+        pass
+
+    def save_cookies(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('{}')
+
+    def set_cookies(self, cookies, clear_cookies=False):
+        pass
+
+    async def user_id(self):
+        return '0'
+
+    async def search_tweet(self, query, product='Latest', count=20, offset=0):
+        await self._call('search_tweet')
+        since_id = 0
+        match = re.search(r'since_id:(\d+)', query)
+        if match:
+            since_id = int(match.group(1))
+        terms = re.sub(r'\w+:\S+', '', query).split()
+        tweets = [
+            tweet for tweet in self.corpus.tweets
+            if int(tweet['id']) > since_id and all(term in tweet['text'] for term in terms)
+        ]
+        return self._result(tweets, offset, count, lambda: self.search_tweet(query, product, count, offset + count))
+
+    async def get_user_by_screen_name(self, screen_name):
+        await self._call('get_user_by_screen_name')
+        account = self.corpus.accounts_by_name.get(screen_name.lower()) or self.corpus.accounts[0]
+        return SimpleNamespace(
+            id=account['id'], screen_name=account['username'], name=account['name'],
+            followers_count=account['followers_count']
+        )
+
+    async def get_user_tweets(self, user_id, tweet_type, count=20):
+        await self._call('get_user_tweets')
+        return self._result(self.corpus.tweets_by_author.get(str(user_id), []), 0, count)
+
+    async def get_tweets_by_ids(self, ids):
+        await self._call('get_tweets_by_ids')
+        return [
+            self.tweet(self.corpus.tweets_by_id[tweet_id]) if tweet_id in self.corpus.tweets_by_id else None
+            for tweet_id in ids
+        ]
+
+    def _result(self, tweets, offset, count, fetch_next=None):
+        chunk = tweets[offset:offset + count]
+        more = offset + count < len(tweets)
+        return FakeTwikitResult([self.tweet(tweet) for tweet in chunk], fetch_next if more else None)
+
+    def tweet(self, tweet):
+        account = self.corpus.accounts_by_id[tweet['author_id']]
+        return SimpleNamespace(
+            id=tweet['id'],
+            user=SimpleNamespace(name=account['name'], screen_name=account['username']),
+            text=tweet['text'],
+            created_at=tweet['created_at'].strftime('%a %b %d %H:%M:%S +0000 %Y'),
+            favorite_count=tweet['like_count'],
+            retweet_count=tweet['retweet_count'],
+            reply_count=tweet['reply_count'],
+        )
+
+
+class FakeOpenAI:
+    """OpenAIクライアントの chat.completions.create だけを真似て、分野のJSONを返す"""
+
+    CATEGORY_HINTS = [
+        ('表現の自由', ['表現', '規制', '非実在']),
+        ('デジタル', ['デジタル', 'マイナンバー']),
+        ('クリエイター', ['著作権', 'クリエイター', 'マンガ', 'アニメ', '同人']),
+        ('法案', ['法案', '政策', '改正']),
+        ('政治活動', ['参議院', '議員', '自民党']),
+    ]
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.request_count = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, max_tokens=None, temperature=None, response_format=None):
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = messages[-1]['content']
+        answer = {}
+        for number, text in re.findall(r'^(\d+)\. @\S+: (.*)$', prompt, re.M):
+            answer[number] = next(
+                (category for category, hints in self.CATEGORY_HINTS if any(hint in text for hint in hints)),
+                'その他'
+            )
+        content = json.dumps(answer, ensure_ascii=False)
+        usage = SimpleNamespace(
+            prompt_tokens=len(prompt), completion_tokens=len(content), total_tokens=len(prompt) + len(content)
+        )
+        with self._lock:
+            self.request_count += 1
+            self.prompt_tokens += usage.prompt_tokens
+            self.completion_tokens += usage.completion_tokens
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=usage
+        )
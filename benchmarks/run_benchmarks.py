@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""偽のTwitter・OpenAIクライアントで収集から出力までの処理時間を計測する
+
+使い方（リポジトリのルートで実行）:
+    python -m benchmarks.run_benchmarks --sizes 1000 10000 --latency 0.005
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from itertools import chain
+
+from benchmarks.corpus import Corpus
+from benchmarks.fakes import FakeOpenAI, FakeTwikitClient, FakeTwitterSession
+from follower_scanner import FollowerScanner
+from near_duplicates import collapse_near_duplicates
+from rate_limiter import RateLimiter
+from report_writer import write_report, write_variants
+from tweet_classifier import iter_sections
+from tweet_record import TweetRecord
+from twitter_api_client import RateLimitedClient
+from twitter_supporter_analyzer import TwitterSupporterAnalyzer
+from twitter_twikit_analyzer import TwitterTwikitAnalyzer
+
+STAGES = ['collect_api', 'collect_twikit', 'near_duplicates', 'filter', 'classify', 'classify_cached', 'classify_local', 'render']
+
+
+def build_analyzer(corpus, args):
+    """偽のバックエンドにつないだTwitterSupporterAnalyzer"""
+    rate_limiter = RateLimiter(burst=args.workers)
+    twitter_client = RateLimitedClient(bearer_token='benchmark', rate_limiter=rate_limiter)
+    twitter_client.session = FakeTwitterSession(corpus, args.latency, args.rate_limit, args.rate_window)
+    analyzer = TwitterSupporterAnalyzer(
+        max_workers=args.workers,
+        twitter_client=twitter_client,
+        openai_client=FakeOpenAI(args.openai_latency),
+        max_pages_per_query=len(corpus.tweets) // 100 + 1
+    )
+    # 全アカウントを監視対象にする
+    analyzer.supporter_accounts = []
+    analyzer.follower_scanner = FollowerScanner(
+        twitter_client, top_n=len(corpus.accounts), pages_per_run=len(corpus.accounts) // 1000 + 1
+    )
+    return analyzer
+
+
+def corpus_records(corpus):
+    """収集を通さずに使う合成ツイート（集計・出力の計測用）"""
+    return [
+        TweetRecord(
+            tweet['id'], corpus.accounts_by_id[tweet['author_id']]['name'],
+            corpus.accounts_by_id[tweet['author_id']]['username'], tweet['text'], tweet['created_at'],
+            tweet['like_count'], tweet['retweet_count'], tweet['reply_count'], '指定アカウント'
+        )
+        for tweet in corpus.tweets
+    ]
+
+
+def run_size(size, args):
+    """1つのコーパスサイズで各段階を計測"""
+    corpus = Corpus(size, n_accounts=args.accounts, seed=args.seed)
+    results = []
+
+    def record(stage, seconds, items, **extra):
+        results.append(dict(
+            size=size, stage=stage, seconds=round(seconds, 4), items=items,
+            items_per_second=round(items / seconds, 1) if seconds > 0 else None, **extra
+        ))
+        print(f"  {stage}: {seconds:.3f}秒 / {items}件")
+
+    # 状態ファイル・レポートは一時ディレクトリに書き出す
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        analyzer = build_analyzer(corpus, args)
+
+        if 'collect_api' in args.stages:
+            session = analyzer.twitter_client.session
+            start = time.perf_counter()
+            tweets = analyzer.get_viral_tweets(days_back=7)
+            record(
+                'collect_api', time.perf_counter() - start, len(tweets),
+                requests=session.request_count, rate_limited=session.rate_window.limited_count,
+                throttle_waits=analyzer.rate_limiter.wait_count,
+                throttled_seconds=round(analyzer.rate_limiter.throttled_seconds, 3)
+            )
+
+        if 'collect_twikit' in args.stages:
+            client = FakeTwikitClient(corpus, args.latency, args.rate_limit, args.rate_window)
+            twikit_analyzer = TwitterTwikitAnalyzer(
+                client=client, openai_client=analyzer.openai_client, user_cache=analyzer.user_cache
+            )
+            start = time.perf_counter()
+            tweets = asyncio.run(twikit_analyzer.collect_all_tweets(days_back=7))
+            record(
+                'collect_twikit', time.perf_counter() - start, len(tweets),
+                requests=client.request_count, rate_limited=client.rate_window.limited_count
+            )
+
+        records = corpus_records(corpus)
+        if 'near_duplicates' in args.stages:
+            start = time.perf_counter()
+            representatives = collapse_near_duplicates(corpus_records(corpus))
+            record('near_duplicates', time.perf_counter() - start, len(records), clusters=len(representatives))
+
+        start = time.perf_counter()
+        relevant = analyzer.filter_relevant_tweets(records)
+        if 'filter' in args.stages:
+            record('filter', time.perf_counter() - start, len(records), relevant=len(relevant))
+
+        categories = {}
+        for stage in ('classify', 'classify_cached'):
+            if stage not in args.stages:
+                continue
+            openai_client = analyzer.openai_client
+            requests_before = openai_client.request_count
+            start = time.perf_counter()
+            categories = analyzer.tweet_classifier.classify(relevant)
+            record(
+                stage, time.perf_counter() - start, len(relevant),
+                requests=openai_client.request_count - requests_before,
+                prompt_tokens=openai_client.prompt_tokens,
+                completion_tokens=openai_client.completion_tokens
+            )
+
+        if 'classify_local' in args.stages:
+            # 上の分類結果（キャッシュ）で学習したローカル分類器で、別の合成ツイートを分類する
+            classifier = analyzer.tweet_classifier
+            unseen = analyzer.filter_relevant_tweets(
+                corpus_records(Corpus(size, n_accounts=args.accounts, seed=args.seed + 1))
+            )
+            start = time.perf_counter()
+            local = classifier.classify_locally(unseen)
+            seconds = time.perf_counter() - start
+            # 偽のAIの分類と一致した割合
+            assigned = [tweet for tweet in unseen if tweet['tweet_id'] in local]
+            expected = classifier._classify_with_model(assigned) if assigned else []
+            agreed = sum(local[tweet['tweet_id']] == category for tweet, category in zip(assigned, expected))
+            record(
+                'classify_local', seconds, len(unseen), local=len(local),
+                agreement=round(agreed / len(assigned), 3) if assigned else None,
+                threshold=round(float(classifier.local_classifier.threshold), 4)
+            )
+
+        if 'render' in args.stages:
+            for tweet in relevant:
+                tweet['category'] = categories.get(tweet['tweet_id'], 'その他')
+            start = time.perf_counter()
+            variant_links = write_variants('benchmark', 'benchmark', relevant)
+            write_report('benchmark', 'benchmark', chain(iter_sections(relevant, categories), [variant_links]), relevant[:20])
+            record(
+                'render', time.perf_counter() - start, len(relevant),
+                bytes=sum(os.path.getsize(os.path.join(directory, name))
+                          for directory, _, names in os.walk('reports') for name in names)
+            )
+
+        analyzer.tweet_store.close()
+        os.chdir(args.root)
+    return results
+
+
+def current_commit(root):
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=root, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return 'unknown'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='偽のバックエンドで分析パイプラインの処理時間を計測')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000], help='合成ツイート数（複数指定可）')
+    parser.add_argument('--accounts', type=int, default=200, help='合成アカウント数')
+    parser.add_argument('--stages', nargs='+', default=STAGES, choices=STAGES, help='計測する段階')
+    parser.add_argument('--latency', type=float, default=0.0, help='Twitterへの1リクエストあたりの遅延（秒）')
+    parser.add_argument('--openai-latency', type=float, default=0.0, help='OpenAIへの1リクエストあたりの遅延（秒）')
+    parser.add_argument('--rate-limit', type=int, default=None, help='エンドポイントごとの上限回数（指定しなければ無制限）')
+    parser.add_argument('--rate-window', type=float, default=1.0, help='レート制限の期間（秒）')
+    parser.add_argument('--workers', type=int, default=8, help='並列リクエスト数')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help='結果のJSON（省略時は benchmarks/results/<コミット>.json）')
+    args = parser.parse_args(argv)
+    args.root = os.getcwd()
+
+    commit = current_commit(args.root)
+    results = []
+    for size in args.sizes:
+        print(f"=== {size}件 ===")
+        results.extend(run_size(size, args))
+
+    output = args.output or os.path.join('benchmarks', 'results', f'{commit}.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    config = {key: value for key, value in vars(args).items() if key not in ('output', 'root')}
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'commit': commit,
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'config': config,
+            'results': results
+        }, f, ensure_ascii=False, indent=2)
+    print(f"結果を保存しました: {output}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1 @@
+# pytest をリポジトリのルートから実行したとき、ルートのモジュールを import できるようにする
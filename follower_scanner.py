@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+import heapq
+import json
+import os
+
+
+class FollowerScanner:
+    """フォロワー一覧を実行ごとに少しずつ走査し、上位候補だけを保持する
+
+    pagination_token と候補のヒープを保存しておき、次回はその続きから走査する。
+    最後のページまで進んだら先頭に戻って次の周回を始める。
+    """
+
+    def __init__(self, twitter_client, path='state/follower_scan.json', top_n=20, pages_per_run=3):
+        # top_n: 保持する候補数（メモリ使用量はこれで一定）
+        # pages_per_run: 1回の実行で取得するページ数（1ページ最大1000件）
+        self.twitter_client = twitter_client
+        self.path = path
+        self.top_n = top_n
+        self.pages_per_run = pages_per_run
+        self.state = self.load()
+
+    def load(self):
+        """保存済みの走査状態を読み込み"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save(self):
+        """走査状態を書き出し（途中で落ちても前回のページから再開できるよう毎ページ呼ぶ）"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def scan(self, user_id, is_candidate, score, on_user=None):
+        """続きのページを走査して上位候補を更新し、スコア順の候補リストを返す
+
+        is_candidate(user) が真のユーザーを score(user) の大きい順に top_n 件保持する。
+        on_user(user) は走査した全ユーザーに対して呼ばれる（キャッシュ登録など）。
+        """
+        scan_state = self.state.setdefault(str(user_id), {
+            'pagination_token': None,
+            'candidates': [],
+            'scanned': 0,
+            'passes': 0
+        })
+        # ヒープは (スコア, ユーザーID, プロフィール) の最小ヒープ
+        heap = [(candidate['score'], candidate['user_id'], candidate) for candidate in scan_state['candidates']]
+        heapq.heapify(heap)
+        in_heap = {candidate['user_id'] for candidate in scan_state['candidates']}
+
+        import tweepy
+        pages = tweepy.Paginator(
+            self.twitter_client.get_users_followers,
+            id=user_id,
+            user_fields=['username', 'name', 'public_metrics', 'verified'],
+            max_results=1000,
+            pagination_token=scan_state['pagination_token'],
+            limit=self.pages_per_run
+        )
+        for response in pages:
+            for user in response.data or []:
+                if on_user is not None:
+                    on_user(user)
+                user_key = str(user.id)
+                if user_key in in_heap:
+                    # 前の周回で候補になっていたアカウントは最新のプロフィールで入れ替える
+                    heap = [entry for entry in heap if entry[1] != user_key]
+                    heapq.heapify(heap)
+                    in_heap.discard(user_key)
+                if not is_candidate(user):
+                    continue
+                candidate = {
+                    'name': user.name,
+                    'username': user.username,
+                    'user_id': user_key,
+                    'followers': user.public_metrics['followers_count'],
+                    'score': score(user)
+                }
+                entry = (candidate['score'], user_key, candidate)
+                if len(heap) < self.top_n:
+                    heapq.heappush(heap, entry)
+                    in_heap.add(user_key)
+                elif entry > heap[0]:
+                    in_heap.discard(heapq.heapreplace(heap, entry)[1])
+                    in_heap.add(user_key)
+
+            # 次のページのトークンを保存（最後のページなら先頭から次の周回）
+            next_token = response.meta.get('next_token')
+            if next_token is None:
+                scan_state['passes'] += 1
+            scan_state['pagination_token'] = next_token
+            scan_state['scanned'] += len(response.data or [])
+            scan_state['candidates'] = [entry[2] for entry in heap]
+            self.save()
+            if next_token is None:
+                break
+
+        return sorted(scan_state['candidates'], key=lambda candidate: candidate['score'], reverse=True)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+import cProfile
+import functools
+import inspect
+import io
+import json
+import os
+import platform
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+
+class RunMetrics:
+    """1回の実行の段階別時間・APIリクエスト数・トークン使用量を集計し、マニフェストとして書き出す
+
+    段階の時間は呼び出しごとの合計（並列に実行した段階は実時間より長くなる）。
+    CPU時間はその段階を実行したスレッドの分だけを数える。
+    """
+
+    def __init__(self, profile=False):
+        self.profile = profile
+        self._lock = threading.Lock()
+        self._profiler = None
+        self.reset()
+
+    def reset(self):
+        """集計をやり直す（実行開始時に呼ぶ）"""
+        if self._profiler is not None:
+            self._profiler.disable()
+        with self._lock:
+            self.stages = {}
+            self.counters = {}
+            self.started_at = datetime.now()
+            self._wall_start = time.perf_counter()
+            self._cpu_start = time.process_time()
+            self._profiler = None
+        if self.profile:
+            # cProfileは有効にしたスレッド（イベントループのあるメインスレッド）だけを記録する
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    @contextmanager
+    def stage(self, name):
+        """with metrics.stage('classify'): のように囲んだ処理の時間を記録"""
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.thread_time() - cpu_start
+            with self._lock:
+                stage = self.stages.setdefault(name, {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0})
+                stage['calls'] += 1
+                stage['wall_seconds'] += wall
+                stage['cpu_seconds'] += cpu
+
+    def timed(self, name):
+        """メソッド全体を段階として記録するデコレーター（asyncメソッドにも使える）"""
+        def decorator(func):
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.stage(name):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, name, value=1):
+        """カウンターに加算（秒数などの小数も可）"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self):
+        """段階別の時間とカウンターの写し（別プロセスの集計を merge() で親に取り込む用）"""
+        with self._lock:
+            return {name: dict(stage) for name, stage in self.stages.items()}, dict(self.counters)
+
+    def merge(self, snapshot):
+        """snapshot() で受け取った集計を加算"""
+        stages, counters = snapshot
+        with self._lock:
+            for name, other in stages.items():
+                stage = self.stages.setdefault(name, {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0})
+                for key, value in other.items():
+                    stage[key] += value
+            for name, value in counters.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def record_usage(self, usage):
+        """OpenAIの応答のusageからトークン数を加算"""
+        if usage is None:
+            return
+        self.count('openai_prompt_tokens', getattr(usage, 'prompt_tokens', 0) or 0)
+        self.count('openai_completion_tokens', getattr(usage, 'completion_tokens', 0) or 0)
+
+    def manifest(self, **extra):
+        """これまでの集計をまとめた辞書"""
+        with self._lock:
+            manifest = {
+                'started_at': self.started_at.isoformat(timespec='seconds'),
+                'finished_at': datetime.now().isoformat(timespec='seconds'),
+                'wall_seconds': round(time.perf_counter() - self._wall_start, 3),
+                'cpu_seconds': round(time.process_time() - self._cpu_start, 3),
+                'python': platform.python_version(),
+                'stages': {
+                    name: {
+                        'calls': stage['calls'],
+                        'wall_seconds': round(stage['wall_seconds'], 3),
+                        'cpu_seconds': round(stage['cpu_seconds'], 3)
+                    }
+                    for name, stage in self.stages.items()
+                },
+                'counters': {
+                    name: round(value, 3) if isinstance(value, float) else value
+                    for name, value in sorted(self.counters.items())
+                }
+            }
+        manifest.update(extra)
+        return manifest
+
+    def write_manifest(self, path, **extra):
+        """マニフェストをJSONで書き出す（プロファイル有効時は .prof も書き出す）"""
+        manifest = self.manifest(**extra)
+        if self._profiler is not None:
+            self._profiler.disable()
+            profile_path = f"{os.path.splitext(path)[0]}.prof"
+            self._profiler.dump_stats(profile_path)
+            stream = io.StringIO()
+            pstats.Stats(self._profiler, stream=stream).sort_stats('cumulative').print_stats(20)
+            manifest['profile'] = {'path': profile_path, 'top_cumulative': stream.getvalue().splitlines()}
+            self._profiler = None
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        return path
+
+
+# 実行全体で共有する集計（ANALYSIS_PROFILE=1 で cProfile も記録）
+metrics = RunMetrics(profile=os.getenv('ANALYSIS_PROFILE') == '1')
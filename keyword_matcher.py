@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+from collections import deque
+
+
+class KeywordMatcher:
+    """Aho-Corasick法で複数キーワードの出現回数を1回の走査で数える"""
+
+    def __init__(self, keywords, weights=None, categories=None):
+        # weights: キーワードごとの重み（省略時は1）
+        # categories: キーワード → 分野名
+        self.keywords = list(dict.fromkeys(keywords))
+        self.weights = weights or {}
+        self.categories = categories or {}
+        self._build()
+
+    def _build(self):
+        # トライ木（状態ごとの遷移表）と各状態で見つかるキーワード
+        self._goto = [{}]
+        self._output = [[]]
+        for index, keyword in enumerate(self.keywords):
+            state = 0
+            for char in keyword.lower():
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._output.append([])
+                state = next_state
+            self._output[state].append(index)
+
+        # 失敗リンクを幅優先で張り、接尾辞で一致するキーワードも出力に含める
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def count(self, text):
+        """キーワードごとの出現回数（一致したものだけ）"""
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        hits = {}
+        state = 0
+        for char in text.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in output[state]:
+                hits[index] = hits.get(index, 0) + 1
+        return {self.keywords[index]: n for index, n in hits.items()}
+
+    def score(self, hits):
+        """一致したキーワードの重みの合計"""
+        return sum(self.weights.get(keyword, 1) for keyword in hits)
+
+    def categories_for(self, hits):
+        """一致したキーワードの分野（重複なし・登録順）"""
+        return list(dict.fromkeys(
+            self.categories[keyword] for keyword in hits if keyword in self.categories
+        ))
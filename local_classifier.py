@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+import re
+import zlib
+
+import numpy as np
+
+_NOISE = re.compile(r'https?://\S+|@\w+|\s+')
+
+
+class LocalClassifier:
+    """過去のAI分類結果から学習する文字n-gram TF-IDFの分類器（分野ごとの重心とのコサイン類似度）
+
+    1位と2位の類似度の差を確信度とし、しきい値以上のツイートだけをローカルで分類する。
+    しきい値は学習データの一部を取り分けて、AIの分類との一致率がmin_precision以上になるように決める。
+    """
+
+    def __init__(self, categories, ngram_sizes=(2, 3), n_features=2 ** 17, min_examples=200,
+                 min_precision=0.95, holdout_ratio=0.2):
+        # n_features: n-gramをハッシュで割り当てる次元数
+        # min_examples: これより学習データが少なければローカル分類しない
+        self.categories = list(categories)
+        self.ngram_sizes = ngram_sizes
+        self.n_features = n_features
+        self.min_examples = min_examples
+        self.min_precision = min_precision
+        self.holdout_ratio = holdout_ratio
+        self.trained_size = 0
+        self.threshold = np.inf
+        self._idf = None
+        self._centroids = None
+
+    @property
+    def ready(self):
+        return self._centroids is not None and np.isfinite(self.threshold)
+
+    def fit(self, examples):
+        """(本文, 分野) のリストから学習し、確信度のしきい値を決める"""
+        self.trained_size = len(examples)
+        self.threshold = np.inf
+        self._idf = self._centroids = None
+        examples = [(text, category) for text, category in examples if category in self.categories]
+        if len(examples) < self.min_examples:
+            return self
+
+        texts = [text for text, _ in examples]
+        labels = np.array([self.categories.index(category) for _, category in examples])
+        counts = self._count_ngrams(texts)
+
+        # 一部を取り分けてしきい値を決め、最後に全件で学習し直す
+        holdout = np.arange(len(texts)) % max(int(round(1 / self.holdout_ratio)), 2) == 0
+        self._train(_select_rows(counts, ~holdout), labels[~holdout])
+        predicted, margins = self._score(_select_rows(counts, holdout))
+        self.threshold = _calibrate(margins, predicted == labels[holdout], self.min_precision)
+        self._train(counts, labels)
+        return self
+
+    def predict(self, texts):
+        """(分野のリスト, 確信度がしきい値以上ならTrueの配列) を返す"""
+        if self._centroids is None:
+            return ['その他'] * len(texts), np.zeros(len(texts), dtype=bool)
+        predicted, margins = self._score(self._count_ngrams(texts))
+        return [self.categories[i] for i in predicted], margins >= self.threshold
+
+    def _count_ngrams(self, texts):
+        """各本文のn-gram出現回数の疎行列（CSR形式の indptr, indices, counts）"""
+        indptr = [0]
+        indices = []
+        counts = []
+        for text in texts:
+            text = _NOISE.sub('', text).lower()
+            hashes = np.fromiter(
+                (zlib.crc32(text[i:i + n].encode('utf-8')) for n in self.ngram_sizes
+                 for i in range(len(text) - n + 1)),
+                dtype=np.int64
+            ) % self.n_features
+            unique, unique_counts = np.unique(hashes, return_counts=True)
+            indices.append(unique)
+            counts.append(unique_counts)
+            indptr.append(indptr[-1] + len(unique))
+        return (
+            np.array(indptr, dtype=np.int64),
+            np.concatenate(indices) if indices else np.empty(0, dtype=np.int64),
+            np.concatenate(counts).astype(np.float32) if counts else np.empty(0, dtype=np.float32)
+        )
+
+    def _weights(self, matrix):
+        """出現回数をTF-IDFにしてL2正規化した値"""
+        indptr, indices, counts = matrix
+        data = (1 + np.log(counts)) * self._idf[indices]
+        rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        norms = np.sqrt(np.bincount(rows, weights=data * data, minlength=len(indptr) - 1))
+        return data / np.maximum(norms[rows], 1e-12), rows
+
+    def _train(self, matrix, labels):
+        indptr, indices, _ = matrix
+        document_frequency = np.bincount(indices, minlength=self.n_features)
+        self._idf = (np.log((1 + len(labels)) / (1 + document_frequency)) + 1).astype(np.float32)
+        data, rows = self._weights(matrix)
+        centroids = np.zeros((len(self.categories), self.n_features), dtype=np.float32)
+        np.add.at(centroids, (labels[rows], indices), data)
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        self._centroids = centroids / np.maximum(norms, 1e-12)
+
+    def _score(self, matrix):
+        """(最も近い分野の番号, 1位と2位の類似度の差) を返す"""
+        indptr, indices, _ = matrix
+        n_rows = len(indptr) - 1
+        data, rows = self._weights(matrix)
+        scores = np.zeros((n_rows, len(self.categories)), dtype=np.float32)
+        np.add.at(scores, rows, (self._centroids[:, indices] * data).T)
+        ordered = np.sort(scores, axis=1)
+        return scores.argmax(axis=1), ordered[:, -1] - ordered[:, -2]
+
+
+def _select_rows(matrix, mask):
+    """CSR行列から mask がTrueの行だけを取り出す"""
+    indptr, indices, counts = matrix
+    lengths = np.diff(indptr)[mask]
+    keep = np.repeat(mask, np.diff(indptr))
+    return np.concatenate([[0], np.cumsum(lengths)]), indices[keep], counts[keep]
+
+
+def _calibrate(margins, correct, min_precision, min_support=20):
+    """確信度の高い順に採用したときの一致率がmin_precision以上になる最小のしきい値"""
+    if len(margins) < min_support:
+        return np.inf
+    order = np.argsort(-margins)
+    precision = np.cumsum(correct[order]) / np.arange(1, len(order) + 1)
+    accepted = np.flatnonzero(precision[min_support - 1:] >= min_precision)
+    if len(accepted) == 0:
+        return np.inf
+    # 0件の差（どの分野とも似ていない）はローカルでは分類しない
+    return max(float(margins[order[accepted[-1] + min_support - 1]]), 1e-6)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+import re
+import zlib
+
+import numpy as np
+
+from tweet_record import TweetBatch
+
+# MinHashの法（2^32より大きい素数）
+_PRIME = 4294967311
+_NOISE = re.compile(r'https?://\S+|@\w+|^RT\b:?|\s+')
+
+
+class NearDuplicateIndex:
+    """MinHashとLSHでほぼ同じ本文のツイート（コピペ・引用の連鎖など）をまとめる
+
+    add() に1件ずつ渡すと、似たツイートが既にあればその代表にエンゲージメントを合算する。
+    合算は代表のコピーに行い、渡されたツイート自体のエンゲージメントは書き換えない。
+    1件あたりの処理はバンド数分のバケット参照だけなので、全体でほぼ線形時間。
+    """
+
+    def __init__(self, num_perm=64, bands=16, threshold=0.7, shingle_size=3, seed=1):
+        # num_perm: MinHashの長さ（bandsで割り切れること）
+        # threshold: 同じクラスタとみなすJaccard係数の推定値の下限
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2 ** 31, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 2 ** 31, size=num_perm, dtype=np.uint64)
+        self._buckets = {}
+        # 代表ツイートのMinHash（行を倍々に確保して追記）
+        self._signatures = np.empty((64, num_perm), dtype=np.uint64)
+        self._representatives = []
+        # 合算用のコピーに差し替えた代表の番号
+        self._copied = set()
+        self.merged_count = 0
+
+    def signature(self, text):
+        """本文の文字n-gramのMinHash（比較できる語がなければNone）"""
+        text = _NOISE.sub(' ', text).strip().lower().replace(' ', '')
+        if not text:
+            return None
+        size = min(self.shingle_size, len(text))
+        shingles = {text[i:i + size] for i in range(len(text) - size + 1)}
+        hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        return ((self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIME).min(axis=1)
+
+    def add(self, tweet):
+        """(代表ツイート, 新しいクラスタならTrue) を返す"""
+        signature = self.signature(tweet['text'])
+        if signature is None:
+            return tweet, True
+
+        band_keys = [
+            (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+        candidates = list({index for key in band_keys for index in self._buckets.get(key, ())})
+        if candidates:
+            similarities = (self._signatures[candidates] == signature).mean(axis=1)
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.threshold:
+                position = candidates[best]
+                representative = self._representatives[position]
+                if position not in self._copied:
+                    # 初めて合算するときに代表をコピーに差し替える
+                    representative = self._representatives[position] = representative.copy()
+                    self._copied.add(position)
+                merge_into(representative, tweet)
+                self.merged_count += 1
+                return representative, False
+
+        index = len(self._representatives)
+        if index == len(self._signatures):
+            self._signatures = np.concatenate([self._signatures, np.empty_like(self._signatures)])
+        self._signatures[index] = signature
+        self._representatives.append(tweet)
+        for key in band_keys:
+            self._buckets.setdefault(key, []).append(index)
+        return tweet, True
+
+
+def merge_into(representative, tweet):
+    """重複ツイートのエンゲージメントを代表に合算（representative は書き換えてよいコピーを渡す）"""
+    representative['likes'] += tweet['likes']
+    representative['retweets'] += tweet['retweets']
+    representative['replies'] += tweet['replies']
+    representative['duplicate_count'] = (representative.get('duplicate_count') or 0) + 1
+
+
+def collapse_near_duplicates(tweets, **options):
+    """似たツイートを1件の代表にまとめたリスト（代表はエンゲージメントが最も高いもの）"""
+    index = NearDuplicateIndex(**options)
+    representatives = {}
+    for tweet in TweetBatch(tweets).ranked():
+        # 合算したクラスタは代表のコピーが返るので、同じtweet_idの値を差し替える
+        representative, _ = index.add(tweet)
+        representatives[representative['tweet_id']] = representative
+    # 合算後のエンゲージメント順に並べ直す
+    return TweetBatch(representatives.values()).ranked()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+
+# 検索クエリの最大文字数（API v2 Basic/Proの recent search は512文字）
+MAX_QUERY_LENGTH = 512
+
+
+def plan_queries(keywords, suffix='-is:retweet lang:ja', max_length=MAX_QUERY_LENGTH):
+    """キーワードをOR結合し、クエリ長の上限に収まるようにまとめる
+
+    戻り値は (クエリ, そのクエリに含めたキーワードのリスト) のリスト
+    """
+    plans = []
+    terms = []
+    group = []
+    for keyword in keywords:
+        term = f"({keyword})" if ' ' in keyword.strip() else keyword
+        candidate = _build_query(terms + [term], suffix)
+        if group and len(candidate) > max_length:
+            plans.append((_build_query(terms, suffix), group))
+            terms = []
+            group = []
+        terms.append(term)
+        group.append(keyword)
+    if group:
+        plans.append((_build_query(terms, suffix), group))
+    return plans
+
+
+def plan_account_queries(usernames, suffix='', max_length=MAX_QUERY_LENGTH):
+    """from:演算子で複数アカウントを1つのクエリにまとめる
+
+    戻り値は (クエリ, そのクエリに含めたユーザー名のリスト) のリスト
+    """
+    return [
+        (query, [term[len('from:'):] for term in terms])
+        for query, terms in plan_queries([f"from:{username}" for username in usernames], suffix, max_length)
+    ]
+
+
+def match_keywords(text, keywords):
+    """本文に全ての語が含まれるキーワード（検索の AND 条件と同じ判定）"""
+    text = text.lower()
+    return [
+        keyword for keyword in keywords
+        if all(term.lower() in text for term in keyword.split())
+    ]
+
+
+def _build_query(terms, suffix):
+    query = terms[0] if len(terms) == 1 else f"({' OR '.join(terms)})"
+    return f"{query} {suffix}".strip()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+import re
+import threading
+import time
+
+from instrumentation import metrics
+
+_ID_SEGMENT = re.compile(r'(?<=\w)/\d+')
+
+
+def endpoint_key(method, route):
+    """ルートのID部分を正規化してエンドポイント単位のキーにする"""
+    return f"{method} {_ID_SEGMENT.sub('/:id', route)}"
+
+
+class RateLimiter:
+    """x-rate-limit-* ヘッダーに合わせてリクエスト間隔を調整するトークンバケット"""
+
+    def __init__(self, burst=8, retry_wait=60):
+        # burst: ヘッダー取得後に連続で送れる最大リクエスト数
+        # retry_wait: 429でリセット時刻が分からない場合の待機秒数
+        self.burst = burst
+        self.retry_wait = retry_wait
+        self.throttled_seconds = 0.0
+        self.wait_count = 0
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key):
+        """トークンを1つ消費する（足りなければ補充まで待機）"""
+        while True:
+            with self._lock:
+                wait = self._take(key)
+                if wait <= 0:
+                    return
+                self.throttled_seconds += wait
+                self.wait_count += 1
+            metrics.count('twitter_rate_limit_waits')
+            metrics.count('twitter_rate_limit_wait_seconds', wait)
+            time.sleep(wait)
+
+    def _take(self, key):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            # 初回はヘッダーが分からないので制限しない
+            return 0
+
+        now = time.time()
+        if bucket['blocked_until'] > now:
+            return bucket['blocked_until'] - now
+        if bucket['blocked_until']:
+            # リセット時刻を過ぎたので次のヘッダーが来るまで制限を解除
+            del self._buckets[key]
+            return 0
+
+        bucket['tokens'] = min(
+            self.burst,
+            bucket['tokens'] + (now - bucket['updated']) * bucket['rate']
+        )
+        bucket['updated'] = now
+        if bucket['tokens'] >= 1:
+            bucket['tokens'] -= 1
+            return 0
+        return (1 - bucket['tokens']) / bucket['rate']
+
+    def update_from_headers(self, key, headers, limited=False):
+        """レスポンスヘッダーの残り回数とリセット時刻からバケットを更新"""
+        now = time.time()
+        remaining = headers.get('x-rate-limit-remaining')
+        reset = headers.get('x-rate-limit-reset')
+
+        with self._lock:
+            if limited or remaining == '0':
+                reset_at = int(reset) + 1 if reset else now + self.retry_wait
+                self._buckets[key] = {
+                    'tokens': 0, 'rate': 0, 'updated': now,
+                    'blocked_until': max(reset_at, now + 1)
+                }
+                return
+            if remaining is None or reset is None:
+                return
+
+            # 残り回数をリセットまでの時間で均等に使い切る
+            window = max(int(reset) - now, 1)
+            rate = int(remaining) / window
+            bucket = self._buckets.get(key)
+            tokens = bucket['tokens'] if bucket and not bucket['blocked_until'] else self.burst
+            self._buckets[key] = {
+                'tokens': min(tokens, int(remaining), self.burst),
+                'rate': rate,
+                'updated': now,
+                'blocked_until': 0
+            }
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+import json
+import os
+import re
+import unicodedata
+from datetime import datetime
+
+from instrumentation import metrics
+from tweet_store import parse_created_at
+
+_URL = re.compile(r'https?://\S+')
+_WORD = re.compile(r'\w+')
+_SCRIPT_RUN = re.compile(r'[\x00-\x7f]+|[^\x00-\x7f]+')
+
+
+class ReportIndex:
+    """レポートの一覧（manifest.json）と月ごとの検索用転置インデックス（<YYYY-MM>.json）
+
+    レポートを書き出すたびに、そのレポートのツイートだけを該当月のシャードに追記する。
+    index.html はマニフェストを読み、検索する期間のシャードだけを取得する。
+    """
+
+    def __init__(self, directory='reports/index'):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+
+    def load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {'reports': [], 'shards': []}
+
+    def add_report(self, report_name, title, html_path, tweets, date=None):
+        """レポート1件を一覧に登録し、ツイートを検索インデックスに追加"""
+        date = date or datetime.now().strftime('%Y-%m-%d')
+        month = date[:7]
+        shard = self.load_shard(month)
+        positions = {doc[0]: i for i, doc in enumerate(shard['docs'])}
+        added = 0
+        count = 0
+        for tweet in tweets:
+            count += 1
+            tweet_id = str(tweet['tweet_id'])
+            created_at = parse_created_at(tweet['created_at'])
+            doc = [
+                tweet_id, tweet['username'], tweet['account_name'],
+                created_at.strftime('%Y-%m-%d') if created_at else '',
+                ' '.join(tweet['text'].split()), tweet.get('category', ''), report_name
+            ]
+            if tweet_id in positions:
+                # 同じ月の別のレポートに載っていたツイートは最新のレポートを指すようにする
+                shard['docs'][positions[tweet_id]] = doc
+                continue
+            position = len(shard['docs'])
+            positions[tweet_id] = position
+            shard['docs'].append(doc)
+            for token in tokenize(f"{tweet['text']} {tweet['username']} {tweet['account_name']}"):
+                shard['postings'].setdefault(token, []).append(position)
+            added += 1
+        shard_path = os.path.join(self.directory, f'{month}.json')
+        _write_json(shard_path, shard)
+
+        manifest = self.load_manifest()
+        manifest['reports'] = [report for report in manifest['reports'] if report['name'] != report_name]
+        manifest['reports'].append({
+            'name': report_name, 'title': title, 'date': date,
+            'path': html_path, 'tweets': count
+        })
+        manifest['reports'].sort(key=lambda report: (report['date'], report['name']), reverse=True)
+        manifest['shards'] = [entry for entry in manifest['shards'] if entry['month'] != month]
+        manifest['shards'].append({
+            'month': month, 'path': shard_path.replace(os.sep, '/'),
+            'docs': len(shard['docs']), 'tokens': len(shard['postings'])
+        })
+        manifest['shards'].sort(key=lambda entry: entry['month'], reverse=True)
+        manifest['updated_at'] = datetime.now().isoformat(timespec='seconds')
+        _write_json(self.manifest_path, manifest)
+        return added
+
+    def load_shard(self, month):
+        """1か月分のインデックス（docs: [tweet_id, username, 表示名, 投稿日, 本文, 分野, レポート名] の一覧）"""
+        try:
+            with open(os.path.join(self.directory, f'{month}.json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {'month': month, 'docs': [], 'postings': {}}
+
+
+def tokenize(text):
+    """検索語の集合（英数字は単語、日本語などは2文字ずつ。index.html の tokenize と同じ規則）"""
+    text = _URL.sub(' ', unicodedata.normalize('NFKC', text).lower())
+    tokens = set()
+    for word in _WORD.findall(text):
+        for run in _SCRIPT_RUN.findall(word):
+            if run.isascii():
+                if len(run) >= 2:
+                    tokens.add(run)
+            elif len(run) == 1:
+                tokens.add(run)
+            else:
+                tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+@metrics.timed('index_report')
+def index_report(report_name, title, html_path, tweets):
+    """書き出したレポートを検索インデックスに追加（失敗してもレポートの生成は止めない）"""
+    try:
+        added = ReportIndex().add_report(report_name, title, html_path, tweets)
+        print(f"検索インデックスを更新しました: {added}件追加")
+    except Exception as e:
+        print(f"検索インデックスの更新エラー: {e}")
+
+
+def write_index_page(index, path='index.md', limit=10):
+    """最新のレポートへのリンクを並べた index.md を書き出す"""
+    reports = [
+        report for report in index.load_manifest()['reports']
+        if os.path.exists(report['path'])
+    ]
+    lines = ["# ソーシャルメディア分析ダッシュボード", "", f"## 📅 日別レポート（最新{limit}件）", ""]
+    if reports:
+        lines.extend(
+            f"- [📊 {report['title']}]({os.path.splitext(report['path'])[0]}.md)"
+            for report in reports[:limit]
+        )
+    else:
+        lines.append("レポートを生成中...")
+    lines.extend(["", "過去のレポート・ツイートは [index.html](index.html) から検索できます。", "", "---",
+                  "*6時間ごとに自動更新（0時、6時、12時、18時）*", ""])
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines))
+    return path
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+if __name__ == "__main__":
+    print(f"インデックスページを書き出しました: {write_index_page(ReportIndex())}")
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+import os
+from html import escape
+from string import Template
+
+import markdown
+
+from instrumentation import metrics
+from tweet_classifier import CATEGORIES, CATEGORY_SLUGS
+from tweet_store import parse_created_at
+
+HTML_HEADER = Template("""<!DOCTYPE html>
+<html lang="ja">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>$title</title>
+    <style>
+        body { font-family: 'Hiragino Sans', 'Yu Gothic', sans-serif; max-width: 800px; margin: 0 auto; padding: 20px; }
+        h1, h2, h3 { color: #333; }
+        .tweet { background: #f5f5f5; padding: 15px; margin: 10px 0; border-radius: 8px; }
+        blockquote { background: #f5f5f5; padding: 10px; border-left: 4px solid #ddd; }
+    </style>
+</head>
+<body>
+""")
+HTML_FOOTER = """
+</body>
+</html>"""
+
+TWEET_ENTRY = Template("""
+### 📱 [$account_name]($url) $relevance_info
+**👍$likes 🔄$retweets 💬$replies** | $created_at | $keyword_info
+
+> $text
+
+<blockquote class="twitter-tweet">
+<a href="$url">🔗 Xで原文を見る（リポスト可能）</a>
+</blockquote>
+
+---
+""")
+# 候補ツイート1件分はMarkdownを変換せず、HTMLもテンプレートから直接組み立てる
+TWEET_ENTRY_HTML = Template("""<h3>📱 <a href="$url">$account_name</a> $relevance_info</h3>
+<p><strong>👍$likes 🔄$retweets 💬$replies</strong> | $created_at | $keyword_info</p>
+<blockquote>
+<p>$text</p>
+</blockquote>
+<blockquote class="twitter-tweet">
+<a href="$url">🔗 Xで原文を見る（リポスト可能）</a>
+</blockquote>
+<hr />""")
+
+# Markdownの変換器は作り直さずに使い回す（レポートの書き出しはメインスレッドだけで行う）
+_converter = markdown.Markdown()
+
+
+def to_html(chunk):
+    return _converter.reset().convert(chunk)
+
+
+def format_tweet_entry(tweet):
+    """リポスト・ウォッチ候補1件分のMarkdown"""
+    fields = _entry_fields(tweet)
+    relevance_info = f"🎯**{fields['relevance_score']}点** " if 'relevance_score' in tweet else ""
+    keyword_info = f"📍 `{fields['search_keyword']}`{fields['duplicates']}"
+    return TWEET_ENTRY.substitute(fields, relevance_info=relevance_info, keyword_info=keyword_info)
+
+
+def format_tweet_entry_html(tweet):
+    """リポスト・ウォッチ候補1件分のHTML（format_tweet_entry を変換したものと同じ内容）"""
+    fields = {key: escape(str(value)) for key, value in _entry_fields(tweet).items()}
+    relevance_info = f"🎯<strong>{fields['relevance_score']}点</strong>" if 'relevance_score' in tweet else ""
+    keyword_info = f"📍 <code>{fields['search_keyword']}</code>{fields['duplicates']}"
+    return TWEET_ENTRY_HTML.substitute(fields, relevance_info=relevance_info, keyword_info=keyword_info)
+
+
+def _entry_fields(tweet):
+    created_at = tweet['created_at'].strftime('%m/%d %H:%M') if hasattr(tweet['created_at'], 'strftime') else tweet['created_at']
+    return {
+        'account_name': tweet['account_name'],
+        'url': tweet['url'],
+        'likes': tweet['likes'],
+        'retweets': tweet['retweets'],
+        'replies': tweet['replies'],
+        'created_at': created_at,
+        'text': tweet['text'],
+        'relevance_score': tweet.get('relevance_score', 0),
+        'search_keyword': tweet.get('search_keyword', 'その他'),
+        'duplicates': f" | 📑 類似{tweet['duplicate_count']}件を合算" if tweet.get('duplicate_count') else "",
+    }
+
+
+class ReportWriter:
+    """1つのレポートをMarkdownとHTMLに断片ごとに書き出す（全文をメモリに組み立てない）
+
+    write() に渡す断片は見出し・リストなどのブロックの区切りで分けること。
+    """
+
+    def __init__(self, report_name, title, output_dir='reports'):
+        path = os.path.join(output_dir, report_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.md_path = f'{path}.md'
+        self.html_path = f'{path}.html'
+        self._md = open(self.md_path, 'w', encoding='utf-8')
+        self._html = open(self.html_path, 'w', encoding='utf-8')
+        self._html.write(HTML_HEADER.substitute(title=title))
+
+    def write(self, chunk, html=None):
+        """Markdownの断片を追記（変換済みのHTMLがあれば html に渡す）"""
+        self._md.write(chunk)
+        self._html.write(to_html(chunk) if html is None else html)
+        self._html.write('\n')
+
+    def write_tweet(self, tweet):
+        """候補ツイート1件を追記"""
+        self.write(format_tweet_entry(tweet), format_tweet_entry_html(tweet))
+
+    def close(self):
+        self._html.write(HTML_FOOTER)
+        self._md.close()
+        self._html.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+@metrics.timed('render_report')
+def write_report(report_name, title, report_content, tweets=()):
+    """レポート（文字列またはMarkdownの断片の並び）と候補ツイートをreports/にMarkdownとHTMLで保存し、HTMLのパスを返す"""
+    chunks = [report_content] if isinstance(report_content, str) else report_content
+    with ReportWriter(report_name, title) as report:
+        for chunk in chunks:
+            report.write(chunk)
+        for tweet in tweets:
+            report.write_tweet(tweet)
+    return report.html_path
+
+
+@metrics.timed('render_variants')
+def write_variants(report_name, title, tweets):
+    """分野別・日別のレポートを reports/<report_name>/ に1回の走査で書き出す
+
+    戻り値は本体のレポートに載せるリンク一覧のMarkdown
+    """
+    titles = dict(CATEGORIES)
+    writers = {}
+    headings = {}
+
+    def writer(variant, heading):
+        if variant not in writers:
+            writers[variant] = ReportWriter(f'{report_name}/{variant}', f'{title} - {heading}')
+            writers[variant].write(f'# {heading}\n\n')
+            headings[variant] = heading
+        return writers[variant]
+
+    try:
+        for tweet in tweets:
+            category = tweet.get('category', 'その他')
+            # 1件のMarkdown・HTMLは1回だけ組み立てて両方に書く
+            entry = format_tweet_entry(tweet)
+            html = format_tweet_entry_html(tweet)
+            writer(f'category-{CATEGORY_SLUGS[category]}', titles[category]).write(entry, html)
+            created_at = parse_created_at(tweet['created_at'])
+            if created_at is not None:
+                day = created_at.strftime('%Y-%m-%d')
+                writer(f'day-{day}', f'📅 {day}').write(entry, html)
+    finally:
+        for report in writers.values():
+            report.close()
+
+    if not writers:
+        return ""
+    # 分野は分類の順、日付は新しい順
+    variants = [f'category-{CATEGORY_SLUGS[key]}' for key, _ in CATEGORIES if f'category-{CATEGORY_SLUGS[key]}' in writers]
+    variants += sorted((variant for variant in writers if variant.startswith('day-')), reverse=True)
+    links = [f"- [{headings[variant]}]({report_name}/{variant}.html)" for variant in variants]
+    return "### 📂 分野別・日別の一覧\n\n" + "\n".join(links) + "\n\n"
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+import os
+import threading
+import time
+
+import numpy as np
+
+from tweet_record import TweetBatch
+
+# 1件28バイトの固定長レコード（追記のみのバイナリファイルにそのまま書き出す）
+SNAPSHOT_DTYPE = np.dtype([
+    ('tweet_id', '<i8'),
+    ('timestamp', '<f8'),
+    ('likes', '<i4'),
+    ('retweets', '<i4'),
+    ('replies', '<i4'),
+])
+
+TWITTER_EPOCH_MS = 1288834974657
+
+
+class SnapshotStore:
+    """実行ごとのエンゲージメント（いいね・RT・リプライ数）をtweet_idごとに追記していく時系列ストア"""
+
+    def __init__(self, path='state/engagement_snapshots.bin', retention_days=14, compact_bytes=32 * 1024 * 1024):
+        # retention_days: 圧縮時に残す期間
+        # compact_bytes: ファイルがこの大きさを超えたら古いスナップショットを削除して書き直す
+        self.path = path
+        self.retention_days = retention_days
+        self.compact_bytes = compact_bytes
+        # 1回の実行で同じツイートを複数回記録しても、同じ時刻として後で1件にまとめる
+        self.run_timestamp = time.time()
+        # この実行で記録したtweet_id（エンゲージメントを取得・更新したツイート）
+        self.observed_ids = set()
+        self._lock = threading.Lock()
+
+    def start_run(self):
+        """以降の記録を新しい実行の時刻で行う（常駐モードで収集のたびに呼ぶ）"""
+        self.run_timestamp = time.time()
+        self.observed_ids = set()
+
+    def record(self, tweets, timestamp=None):
+        """現在のエンゲージメントをスナップショットとして追記"""
+        if not tweets:
+            return
+        batch = TweetBatch(tweets)
+        snapshots = np.empty(len(batch), dtype=SNAPSHOT_DTYPE)
+        snapshots['tweet_id'] = np.frombuffer(batch.tweet_ids, dtype=np.int64)
+        snapshots['timestamp'] = self.run_timestamp if timestamp is None else timestamp
+        snapshots['likes'] = np.frombuffer(batch.likes, dtype=np.int64)
+        snapshots['retweets'] = np.frombuffer(batch.retweets, dtype=np.int64)
+        snapshots['replies'] = np.frombuffer(batch.replies, dtype=np.int64)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self._lock:
+            self.observed_ids.update(batch.tweet_ids)
+            with open(self.path, 'ab') as f:
+                snapshots.tofile(f)
+            if os.path.getsize(self.path) > self.compact_bytes:
+                self._compact()
+
+    def load(self):
+        """全スナップショット（構造化配列）"""
+        with self._lock:
+            try:
+                return np.fromfile(self.path, dtype=SNAPSHOT_DTYPE)
+            except FileNotFoundError:
+                return np.empty(0, dtype=SNAPSHOT_DTYPE)
+
+    def compact(self):
+        """保持期間より古いスナップショットを削除"""
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        snapshots = np.fromfile(self.path, dtype=SNAPSHOT_DTYPE)
+        snapshots = snapshots[snapshots['timestamp'] >= time.time() - self.retention_days * 86400]
+        tmp_path = f"{self.path}.tmp"
+        snapshots.tofile(tmp_path)
+        os.replace(tmp_path, self.path)
+
+    def velocities(self, window_days=7):
+        """tweet_idごとの直近の伸び（1時間あたりのいいね+RT）と加速度をまとめて計算
+
+        スナップショットが1件しかないツイートは投稿時刻（tweet_idから算出）を起点にする。
+        戻り値は (tweet_idの昇順配列, 伸び, 加速度)
+        """
+        snapshots = self.load()
+        snapshots = snapshots[snapshots['timestamp'] >= time.time() - window_days * 86400]
+        if len(snapshots) == 0:
+            empty = np.empty(0)
+            return np.empty(0, dtype=np.int64), empty, empty
+
+        snapshots = snapshots[np.lexsort((snapshots['timestamp'], snapshots['tweet_id']))]
+        # 同じ実行（同じ時刻）のスナップショットは最後の1件だけを使う
+        distinct = np.append(
+            (snapshots['tweet_id'][1:] != snapshots['tweet_id'][:-1])
+            | (snapshots['timestamp'][1:] != snapshots['timestamp'][:-1]),
+            True
+        )
+        snapshots = snapshots[distinct]
+        ids = snapshots['tweet_id']
+        timestamps = snapshots['timestamp']
+        engagement = snapshots['likes'].astype(np.int64) + snapshots['retweets']
+
+        # 各ツイートの最新・1つ前・2つ前のスナップショット
+        last = np.flatnonzero(np.append(ids[1:] != ids[:-1], True))
+        prev = last - 1
+        has_prev = (prev >= 0) & (ids[np.maximum(prev, 0)] == ids[last])
+        prev2 = last - 2
+        has_prev2 = has_prev & (prev2 >= 0) & (ids[np.maximum(prev2, 0)] == ids[last])
+
+        posted_at = ((ids[last] >> 22) + TWITTER_EPOCH_MS) / 1000
+        prev_time = np.where(has_prev, timestamps[np.maximum(prev, 0)], posted_at)
+        prev_engagement = np.where(has_prev, engagement[np.maximum(prev, 0)], 0)
+        prev2_time = np.where(has_prev2, timestamps[np.maximum(prev2, 0)], posted_at)
+        prev2_engagement = np.where(has_prev2, engagement[np.maximum(prev2, 0)], 0)
+
+        # 間隔は最低1分として1時間あたりに換算
+        hours = np.maximum(timestamps[last] - prev_time, 60) / 3600
+        velocity = (engagement[last] - prev_engagement) / hours
+        prev_hours = np.maximum(prev_time - prev2_time, 60) / 3600
+        prev_velocity = (prev_engagement - prev2_engagement) / prev_hours
+        acceleration = np.where(has_prev, (velocity - prev_velocity) / hours, 0.0)
+        return ids[last], velocity, acceleration
+
+
+def rank_by_velocity(tweets, velocities, limit=None):
+    """関連度 → 伸び → 加速度 の順に並べる（スナップショットのないツイートは伸び0）"""
+    if not tweets:
+        return []
+    velocity_ids, velocity, acceleration = velocities
+    batch = TweetBatch(tweets)
+    tweet_ids = np.frombuffer(batch.tweet_ids, dtype=np.int64)
+    relevance = np.array([tweet.get('relevance_score') or 0 for tweet in batch.records], dtype=np.float64)
+
+    # tweet_idの昇順配列から二分探索で対応付け
+    tweet_velocity = np.zeros(len(tweet_ids))
+    tweet_acceleration = np.zeros(len(tweet_ids))
+    if len(velocity_ids):
+        positions = np.minimum(np.searchsorted(velocity_ids, tweet_ids), len(velocity_ids) - 1)
+        found = velocity_ids[positions] == tweet_ids
+        tweet_velocity[found] = velocity[positions[found]]
+        tweet_acceleration[found] = acceleration[positions[found]]
+
+    order = np.lexsort((-tweet_acceleration, -tweet_velocity, -relevance))
+    if limit is not None:
+        order = order[:limit]
+    return [batch.records[i] for i in order]
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+import json
+import re
+
+from keyword_matcher import KeywordMatcher
+
+# レポートのファイル名に使うので英小文字・数字・-・_ だけにする
+_SLUG = re.compile(r'[a-z0-9_-]*')
+
+# 山田太郎議員関連キーワード
+YAMADA_KEYWORDS = [
+    '山田太郎', '表現の自由', '著作権', 'クリエイター', 'DX', 'デジタル',
+    '児童ポルノ', '児ポ', '非実在', '表現規制', 'CODA', 'TPP',
+    'コンテンツ', 'アニメ', 'マンガ', 'ゲーム', '同人', 'オタク',
+    'IT政策', 'デジタル庁', 'マイナンバー', 'サイバー', 'AI規制',
+    '参議院', '自民党', '政治', '議員', '政策', '法案'
+]
+
+# キーワードの分野（レポートの分野別一覧に対応）
+KEYWORD_CATEGORIES = {
+    '表現の自由': '表現の自由', '児童ポルノ': '表現の自由', '児ポ': '表現の自由',
+    '非実在': '表現の自由', '表現規制': '表現の自由', 'AI規制': '表現の自由',
+    'DX': 'デジタル', 'デジタル': 'デジタル', 'IT政策': 'デジタル',
+    'デジタル庁': 'デジタル', 'マイナンバー': 'デジタル', 'サイバー': 'デジタル',
+    '著作権': 'クリエイター', 'クリエイター': 'クリエイター', 'CODA': 'クリエイター',
+    'コンテンツ': 'クリエイター', 'アニメ': 'クリエイター', 'マンガ': 'クリエイター',
+    'ゲーム': 'クリエイター', '同人': 'クリエイター', 'オタク': 'クリエイター',
+    'TPP': '法案', '政策': '法案', '法案': '法案',
+    '参議院': '政治活動', '自民党': '政治活動', '政治': '政治活動', '議員': '政治活動'
+}
+
+
+class Target:
+    """監視対象（政治家）1人分の設定：支援者アカウント・検索クエリ・関連キーワード"""
+
+    def __init__(self, name, slug='', user_id=None, accounts=None, search_queries=None,
+                 twikit_queries=None, important_users=None, keywords=None,
+                 keyword_categories=None, keyword_weights=None):
+        # slug: レポートのファイル名に付ける識別子（空なら従来どおり report_<日付>）
+        # user_id: フォロワーから支援者を自動検出する本人のユーザーID
+        self.name = name
+        self.slug = slug
+        self.user_id = str(user_id) if user_id else None
+        self.accounts = accounts or []
+        self.search_queries = search_queries or []
+        self.twikit_queries = twikit_queries or []
+        self.important_users = important_users or []
+        # 関連キーワードの照合器（キーワードセットごとに1回だけ構築）
+        self.keyword_matcher = KeywordMatcher(keywords or [], weights=keyword_weights, categories=keyword_categories)
+
+    @classmethod
+    def from_dict(cls, config):
+        """targets.json の1項目から作成（accounts はリストまたはJSONファイルのパス）"""
+        config = dict(config)
+        if isinstance(config.get('accounts'), str):
+            config['accounts'] = load_accounts(config['accounts'])
+        return cls(**config)
+
+    def score_relevance(self, tweet):
+        """関連キーワードを含むツイートに関連度と分野を付ける（関連ツイートならTrue）"""
+        # キーワードマッチング（全キーワードを1回の走査で照合）
+        hits = self.keyword_matcher.count(tweet['text'])
+        if not hits:
+            # 別の監視対象・前回の実行で付いた関連度は引き継がない
+            tweet['relevance_score'] = None
+            tweet['relevance_categories'] = None
+            return False
+        tweet['relevance_score'] = self.keyword_matcher.score(hits)
+        tweet['relevance_categories'] = self.keyword_matcher.categories_for(hits)
+        return True
+
+    def report_name(self, report_date, prefix='report'):
+        return f'{prefix}_{self.slug}_{report_date}' if self.slug else f'{prefix}_{report_date}'
+
+
+def default_target():
+    """targets.json がないときの監視対象（山田太郎議員）"""
+    return Target(
+        '山田太郎議員',
+        user_id='362083895',
+        accounts=load_accounts('supporter_accounts.json'),
+        search_queries=['山田太郎 議員', '表現の自由 山田太郎'],
+        twikit_queries=['山田太郎 議員', '山田太郎 参議院', '表現の自由 山田太郎', '著作権 山田太郎', 'クリエイター 山田太郎'],
+        important_users=['yamadataro43'],
+        keywords=YAMADA_KEYWORDS,
+        keyword_categories=KEYWORD_CATEGORIES
+    )
+
+
+def load_targets(path='targets.json'):
+    """監視対象の一覧を設定ファイルから読み込み（なければ山田太郎議員のみ）"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            targets = [Target.from_dict(config) for config in json.load(f)]
+    except FileNotFoundError:
+        return [default_target()]
+    validate_targets(targets)
+    return targets
+
+
+def validate_targets(targets):
+    """レポートが上書きし合わないよう、slug が一意で使える文字だけかを確認"""
+    if not targets:
+        raise ValueError("targets.json に監視対象がありません")
+    seen = set()
+    for target in targets:
+        if not _SLUG.fullmatch(target.slug):
+            raise ValueError(f"slug には英小文字・数字・-・_ だけを使ってください: {target.name} ({target.slug!r})")
+        if target.slug in seen:
+            # slug が空の対象は report_<日付> に書き出すので、空にできるのは1件だけ
+            label = f"slug {target.slug!r}" if target.slug else "slug のない監視対象（2件目以降）"
+            raise ValueError(f"{label} が重複しています: {target.name}")
+        seen.add(target.slug)
+
+
+def load_accounts(path):
+    """支援者アカウントリストを読み込み"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def merge_accounts(account_lists):
+    """複数の監視対象のアカウントをuser_id（なければユーザー名）で重複を除いてまとめる"""
+    accounts = {}
+    for account_list in account_lists:
+        for account in account_list:
+            key = str(account.get('user_id') or account.get('username', '')).lower()
+            accounts.setdefault(key, account)
+    return list(accounts.values())
+
+
+def merge_values(value_lists):
+    """検索クエリなどを登録順のまま重複を除いてまとめる"""
+    return list(dict.fromkeys(value for values in value_lists for value in values))
@@ -0,0 +1,41 @@
+import asyncio
+import itertools
+import threading
+
+import pytest
+
+from analysis_pipeline import iterate_in_thread
+
+
+def test_yields_every_item():
+    async def collect():
+        return [item async for item in iterate_in_thread(lambda: iter(range(50)), buffer_size=4)]
+
+    assert asyncio.run(collect()) == list(range(50))
+
+
+def test_producer_error_reaches_consumer():
+    def failing():
+        yield 1
+        raise RuntimeError('収集エラー')
+
+    async def collect():
+        return [item async for item in iterate_in_thread(failing)]
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(collect())
+
+
+def test_producer_stops_when_consumer_stops():
+    threads = threading.active_count()
+
+    async def consume():
+        async for item in iterate_in_thread(itertools.count, buffer_size=2, put_timeout=0.05):
+            if item == 5:
+                raise ValueError('途中で失敗')
+
+    for _ in range(3):
+        # 書き手のスレッドが止まらなければ asyncio.run は既定のスレッドプールを待ったまま戻らない
+        with pytest.raises(ValueError):
+            asyncio.run(consume())
+    assert threading.active_count() == threads
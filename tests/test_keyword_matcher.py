@@ -0,0 +1,53 @@
+import pytest
+
+from benchmarks.corpus import Corpus
+from keyword_matcher import KeywordMatcher
+from targets import YAMADA_KEYWORDS
+
+
+def substring_hits(text, keywords):
+    """置き換える前の判定（キーワードごとに小文字で部分一致）"""
+    text = text.lower()
+    return {keyword for keyword in keywords if keyword.lower() in text}
+
+
+@pytest.fixture(scope='module')
+def corpus_texts():
+    return [tweet['text'] for tweet in Corpus(2000, seed=3).tweets]
+
+
+def test_matches_substring_on_corpus(corpus_texts):
+    matcher = KeywordMatcher(YAMADA_KEYWORDS)
+    for text in corpus_texts:
+        hits = matcher.count(text)
+        assert set(hits) == substring_hits(text, YAMADA_KEYWORDS)
+        assert matcher.score(hits) == len(substring_hits(text, YAMADA_KEYWORDS))
+
+
+@pytest.mark.parametrize('text', [
+    '山田太郎議員と山田さん',
+    'AIとai規制、Ai倫理',
+    '著作権法と著作権',
+    '',
+    'キーワードなし',
+])
+def test_overlapping_and_case_insensitive(text):
+    keywords = ['山田', '山田太郎', '太郎議員', 'AI', 'ai規制', '著作権', '著作権法']
+    matcher = KeywordMatcher(keywords)
+    assert set(matcher.count(text)) == substring_hits(text, keywords)
+
+
+def test_counts_every_occurrence():
+    matcher = KeywordMatcher(['表現の自由', '自由'])
+    assert matcher.count('表現の自由と自由') == {'表現の自由': 1, '自由': 2}
+
+
+def test_weights_and_categories():
+    matcher = KeywordMatcher(
+        ['著作権', 'マンガ', 'デジタル'],
+        weights={'著作権': 3},
+        categories={'著作権': '表現', 'マンガ': '表現', 'デジタル': 'デジタル'},
+    )
+    hits = matcher.count('マンガの著作権')
+    assert matcher.score(hits) == 4
+    assert matcher.categories_for(hits) == ['表現']
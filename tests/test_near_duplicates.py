@@ -0,0 +1,75 @@
+from near_duplicates import NearDuplicateIndex, collapse_near_duplicates
+from tweet_record import TweetRecord
+
+TEXT = '山田太郎議員の国会質問、表現の自由を守るための大事な論点でした。みんな見てほしい'
+
+
+def make_tweet(tweet_id, text, likes, retweets=0, replies=0):
+    return TweetRecord(tweet_id, '名前', f'user{tweet_id}', text, '2026-09-01T00:00:00+00:00',
+                       likes=likes, retweets=retweets, replies=replies)
+
+
+def test_near_duplicates_merge_into_one_representative():
+    tweets = [
+        make_tweet(1, TEXT, 10, 2, 1),
+        make_tweet(2, f'RT @user1: {TEXT} https://t.co/abc', 5, 1),
+        make_tweet(3, TEXT + '！', 3),
+    ]
+    collapsed = collapse_near_duplicates(tweets)
+    assert len(collapsed) == 1
+    representative = collapsed[0]
+    assert representative['tweet_id'] == 1
+    assert (representative['likes'], representative['retweets'], representative['replies']) == (18, 3, 1)
+    assert representative['duplicate_count'] == 2
+
+
+def test_merging_does_not_modify_originals():
+    tweets = [make_tweet(1, TEXT, 10), make_tweet(2, TEXT, 5), make_tweet(3, TEXT, 3)]
+    collapsed = collapse_near_duplicates(tweets)
+    assert collapsed[0] is not tweets[0]
+    assert [tweet['likes'] for tweet in tweets] == [10, 5, 3]
+    assert all('duplicate_count' not in tweet for tweet in tweets)
+
+
+def test_distinct_texts_are_kept():
+    tweets = [
+        make_tweet(1, TEXT, 10),
+        make_tweet(2, '今日はいい天気なので散歩に行ってコーヒーを飲んできました', 5),
+        make_tweet(3, 'マイナンバーカードの件でデジタル庁に問い合わせた結果', 3),
+    ]
+    collapsed = collapse_near_duplicates(tweets)
+    assert [tweet['tweet_id'] for tweet in collapsed] == [1, 2, 3]
+    assert all(tweet is original for tweet, original in zip(collapsed, tweets))
+
+
+def test_text_without_content_is_its_own_cluster():
+    index = NearDuplicateIndex()
+    tweet = make_tweet(1, 'https://t.co/abc @someone', 1)
+    assert index.signature(tweet['text']) is None
+    assert index.add(tweet) == (tweet, True)
+    assert index.add(make_tweet(2, 'https://t.co/abc @someone', 1))[1] is True
+    assert index.merged_count == 0
+
+
+def test_index_returns_merged_representative():
+    index = NearDuplicateIndex()
+    first = make_tweet(1, TEXT, 10)
+    assert index.add(first) == (first, True)
+    representative, is_new = index.add(make_tweet(2, TEXT, 5))
+    assert not is_new
+    assert representative['likes'] == 15
+    representative, _ = index.add(make_tweet(3, TEXT, 1))
+    assert representative['likes'] == 16
+    assert representative['duplicate_count'] == 2
+    assert first['likes'] == 10
+    assert index.merged_count == 2
+
+
+def test_copy_is_independent():
+    tweet = make_tweet(1, TEXT, 10)
+    copied = tweet.copy()
+    copied['likes'] += 5
+    copied['duplicate_count'] = 1
+    assert tweet['likes'] == 10
+    assert 'duplicate_count' not in tweet
+    assert copied.to_dict()['likes'] == 15
@@ -0,0 +1,30 @@
+from query_planner import match_keywords, plan_account_queries, plan_queries
+
+
+def test_queries_fit_length_limit():
+    keywords = [f'キーワード{i}' for i in range(200)] + ['表現の自由 規制', '山田太郎 議員']
+    plans = plan_queries(keywords, max_length=120)
+    assert len(plans) > 1
+    assert all(len(query) <= 120 for query, _ in plans)
+    assert [keyword for _, group in plans for keyword in group] == keywords
+    assert all(query.endswith(' -is:retweet lang:ja') for query, _ in plans)
+
+
+def test_single_query_and_grouping():
+    plans = plan_queries(['山田太郎 議員', '表現の自由'])
+    assert plans == [('((山田太郎 議員) OR 表現の自由) -is:retweet lang:ja', ['山田太郎 議員', '表現の自由'])]
+    assert plan_queries(['著作権']) == [('著作権 -is:retweet lang:ja', ['著作権'])]
+
+
+def test_account_queries_fit_length_limit():
+    usernames = [f'user_{i:05d}' for i in range(300)]
+    plans = plan_account_queries(usernames, max_length=512)
+    assert len(plans) > 1
+    assert all(len(query) <= 512 for query, _ in plans)
+    assert [username for _, group in plans for username in group] == usernames
+    assert plans[0][0].startswith('(from:user_00000 OR from:user_00001')
+
+
+def test_match_keywords_uses_and_condition():
+    keywords = ['山田太郎 議員', '表現の自由', 'AI']
+    assert match_keywords('山田太郎 参議院議員がai について', keywords) == ['山田太郎 議員', 'AI']
@@ -0,0 +1,100 @@
+import pytest
+
+import rate_limiter
+from rate_limiter import RateLimiter, endpoint_key
+
+
+class FakeClock:
+    """time.time / time.sleep の代わり（sleepした分だけ時刻を進める）"""
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, 'time', clock.time)
+    monkeypatch.setattr(rate_limiter.time, 'sleep', clock.sleep)
+    return clock
+
+
+def test_endpoint_key_normalizes_ids():
+    assert endpoint_key('GET', '/2/users/12345/tweets') == 'GET /2/users/:id/tweets'
+    assert endpoint_key('GET', '/2/tweets/search/recent') == 'GET /2/tweets/search/recent'
+
+
+def test_no_wait_before_first_headers(clock):
+    limiter = RateLimiter(burst=2)
+    for _ in range(10):
+        limiter.acquire('search')
+    assert clock.sleeps == []
+
+
+def test_remaining_is_spread_until_reset(clock):
+    limiter = RateLimiter(burst=2)
+    # 残り10回・100秒後にリセット → 10秒に1回
+    limiter.update_from_headers('search', {
+        'x-rate-limit-remaining': '10', 'x-rate-limit-reset': str(int(clock.now) + 100)
+    })
+    limiter.acquire('search')
+    limiter.acquire('search')
+    assert clock.sleeps == []
+    limiter.acquire('search')
+    assert clock.sleeps == [pytest.approx(10)]
+    assert limiter.wait_count == 1
+
+
+def test_burst_is_capped_by_remaining(clock):
+    limiter = RateLimiter(burst=8)
+    limiter.update_from_headers('search', {
+        'x-rate-limit-remaining': '1', 'x-rate-limit-reset': str(int(clock.now) + 60)
+    })
+    limiter.acquire('search')
+    assert clock.sleeps == []
+    limiter.acquire('search')
+    assert clock.sleeps == [pytest.approx(60)]
+
+
+def test_zero_remaining_blocks_until_reset(clock):
+    limiter = RateLimiter()
+    reset = int(clock.now) + 30
+    limiter.update_from_headers('search', {'x-rate-limit-remaining': '0', 'x-rate-limit-reset': str(reset)})
+    limiter.acquire('search')
+    # リセット時刻の1秒後まで待ち、その後は次のヘッダーまで制限しない
+    assert clock.now == pytest.approx(reset + 1)
+    limiter.acquire('search')
+    limiter.acquire('search')
+    assert len(clock.sleeps) == 1
+
+
+def test_rate_limited_without_reset_waits_retry_wait(clock):
+    limiter = RateLimiter(retry_wait=45)
+    limiter.update_from_headers('search', {}, limited=True)
+    limiter.acquire('search')
+    assert clock.sleeps == [pytest.approx(45)]
+
+
+def test_missing_headers_leave_bucket_unchanged(clock):
+    limiter = RateLimiter(burst=1)
+    limiter.update_from_headers('search', {'x-rate-limit-remaining': '5'})
+    for _ in range(5):
+        limiter.acquire('search')
+    assert clock.sleeps == []
+
+
+def test_buckets_are_per_endpoint(clock):
+    limiter = RateLimiter()
+    limiter.update_from_headers('search', {
+        'x-rate-limit-remaining': '0', 'x-rate-limit-reset': str(int(clock.now) + 30)
+    })
+    limiter.acquire('followers')
+    assert clock.sleeps == []
@@ -0,0 +1,19 @@
+from snapshot_store import SnapshotStore
+from tweet_record import TweetRecord
+
+
+def make_tweet(tweet_id, likes):
+    return TweetRecord(tweet_id, '名前', 'user', '本文', None, likes=likes)
+
+
+def test_observed_ids_are_per_run(tmp_path):
+    store = SnapshotStore(str(tmp_path / 'snapshots.bin'))
+    store.record([make_tweet(1, 5), make_tweet(2, 0)])
+    assert store.observed_ids == {1, 2}
+
+    # 常駐モードの次の収集では、取得し直したツイートだけが記録される
+    store.start_run()
+    assert store.observed_ids == set()
+    store.record([make_tweet(2, 3)])
+    assert store.observed_ids == {2}
+    assert store.load()['tweet_id'].tolist() == [1, 2, 2]
@@ -0,0 +1,30 @@
+from analysis_pipeline import TargetRanker
+from targets import Target
+from tweet_record import TweetRecord
+
+TEXT = 'マンガとアニメの未来について語り合う会に参加してきました。とても楽しかった'
+
+
+def make_tweet(tweet_id, text, likes, relevance_score=None):
+    return TweetRecord(tweet_id, '名前', 'user', text, None, likes=likes, relevance_score=relevance_score)
+
+
+def test_stale_relevance_is_not_carried_over():
+    ranker = TargetRanker(Target('佐藤議員', slug='sato', keywords=['デジタル', 'マイナンバー']))
+    # 前回の実行・別の対象で付いた関連度を持つ引き継ぎのツイート
+    first = make_tweet(1, TEXT, 10, relevance_score=3)
+    assert not ranker.add(first)
+    assert 'relevance_score' not in first
+    assert not ranker.add(make_tweet(2, TEXT, 5, relevance_score=3))
+    assert ranker.relevant_count == 0
+    assert len(ranker.relevant) == 0
+    assert [(tweet['tweet_id'], tweet['likes']) for tweet in ranker.ranked()] == [(1, 15)]
+
+
+def test_merged_duplicates_stay_relevant():
+    ranker = TargetRanker(Target('佐藤議員', slug='sato', keywords=['マイナンバー']))
+    text = 'マイナンバーカードの件でデジタル庁に問い合わせた結果をまとめました'
+    assert ranker.add(make_tweet(1, text, 10))
+    assert not ranker.add(make_tweet(2, text, 5))
+    assert ranker.add(make_tweet(3, '今日はいい天気なので散歩に行ってきた。マイナンバーの話', 1))
+    assert [(tweet['tweet_id'], tweet['likes']) for tweet in ranker.ranked()] == [(1, 15), (3, 1)]
@@ -0,0 +1,81 @@
+import gzip
+import os
+
+import numpy as np
+
+from tweet_archive import INDEX_DTYPE, TweetArchive
+from tweet_record import TweetRecord
+
+ARCHIVED_AT = 1_790_000_000.0
+
+
+def make_tweet(tweet_id, day, likes=0, username='user', keyword='山田太郎'):
+    return TweetRecord(tweet_id, '名前', username, f'本文{tweet_id}', f'2026-09-{day:02d}T12:00:00+00:00',
+                       likes=likes, search_keyword=keyword)
+
+
+def test_index_matches_blocks(tmp_path):
+    archive = TweetArchive(str(tmp_path), block_size=3)
+    assert archive.append([make_tweet(i, 1) for i in range(7)], archived_at=ARCHIVED_AT) == 7
+
+    index = np.fromfile(tmp_path / '2026-09' / '2026-09-01.idx', dtype=INDEX_DTYPE)
+    assert index['count'].tolist() == [3, 3, 1]
+    assert index['archived_at'].tolist() == [ARCHIVED_AT] * 3
+    # ブロックは隙間なく連結され、索引の長さの合計がファイルの大きさになる
+    assert index['offset'].tolist() == [0, int(index['length'][0]), int(index['length'][:2].sum())]
+    assert int(index['length'].sum()) == os.path.getsize(tmp_path / '2026-09' / '2026-09-01.jsonl.gz')
+
+
+def test_scan_round_trip(tmp_path):
+    archive = TweetArchive(str(tmp_path), block_size=2)
+    archive.append([make_tweet(1, 1, likes=5), make_tweet(2, 2), make_tweet(3, 1)], archived_at=ARCHIVED_AT)
+    records = list(archive.scan())
+    assert [record['tweet_id'] for record in records] == ['1', '3', '2']
+    assert records[0] == {
+        'tweet_id': '1', 'username': 'user', 'account_name': '名前', 'text': '本文1',
+        'created_at': '2026-09-01T12:00:00+00:00', 'likes': 5, 'retweets': 0, 'replies': 0,
+        'search_keyword': '山田太郎', 'archived_at': '2026-09-21T14:13:20+00:00',
+    }
+    assert archive.partitions() == ['2026-09-01', '2026-09-02']
+    assert [record['tweet_id'] for record in archive.scan('2026-09-02', '2026-09-30')] == ['2']
+
+
+def test_readable_with_gzip(tmp_path):
+    archive = TweetArchive(str(tmp_path), block_size=2)
+    archive.append([make_tweet(i, 1) for i in range(5)])
+    archive.append([make_tweet(5, 1)])
+    with gzip.open(tmp_path / '2026-09' / '2026-09-01.jsonl.gz', 'rt', encoding='utf-8') as f:
+        assert len(f.readlines()) == 6
+
+
+def test_records_are_snapshots(tmp_path):
+    archive = TweetArchive(str(tmp_path))
+    tweet = make_tweet(1, 1, likes=10)
+    archive.add(tweet)
+    tweet['likes'] = 100
+    tweet['relevance_score'] = 3
+    archive.flush(ARCHIVED_AT)
+    record, = archive.scan()
+    assert record['likes'] == 10
+    assert 'relevance_score' not in record
+
+
+def test_latest_and_aggregates(tmp_path):
+    archive = TweetArchive(str(tmp_path))
+    archive.append([make_tweet(1, 1, likes=1, username='a'), make_tweet(2, 1, username='b', keyword='著作権')],
+                   archived_at=ARCHIVED_AT)
+    archive.append([make_tweet(1, 1, likes=8, username='a'), make_tweet(3, 2, likes=2, username='a')],
+                   archived_at=ARCHIVED_AT + 3600)
+    assert sorted((record['tweet_id'], record['likes']) for record in archive.latest()) == [
+        ('1', 8), ('2', 0), ('3', 2)
+    ]
+    counts = archive.keyword_counts_by_day()
+    assert counts['2026-09-01'] == {'山田太郎': 1, '著作権': 1}
+    assert counts['2026-09-02'] == {'山田太郎': 1}
+    assert archive.top_authors() == [('a', 2, 10), ('b', 1, 0)]
+
+
+def test_missing_directory_is_empty(tmp_path):
+    archive = TweetArchive(str(tmp_path / 'missing'))
+    assert archive.partitions() == []
+    assert list(archive.scan()) == []
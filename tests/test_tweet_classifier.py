@@ -0,0 +1,92 @@
+import pytest
+
+import tweet_classifier
+from benchmarks.fakes import FakeOpenAI
+from tweet_classifier import ClassificationCache, TweetClassifier
+from tweet_record import TweetRecord
+
+DAY = 86400
+
+
+def make_tweet(tweet_id, text):
+    return TweetRecord(tweet_id, '名前', f'user{tweet_id}', text, None, likes=10)
+
+
+@pytest.fixture
+def now(monkeypatch):
+    clock = [1_790_000_000.0]
+    monkeypatch.setattr(tweet_classifier.time, 'time', lambda: clock[0])
+    return clock
+
+
+def test_key_depends_on_id_text_and_model():
+    tweet = make_tweet(1, '表現の自由を守る')
+    key = ClassificationCache.key(tweet, 'gpt-4o-mini')
+    assert key == ClassificationCache.key(make_tweet(1, '表現の自由を守る'), 'gpt-4o-mini')
+    assert len({
+        key,
+        ClassificationCache.key(make_tweet(2, '表現の自由を守る'), 'gpt-4o-mini'),
+        ClassificationCache.key(make_tweet(1, '表現の自由を守る！'), 'gpt-4o-mini'),
+        ClassificationCache.key(tweet, 'gpt-4o'),
+    }) == 4
+
+
+def test_entries_expire_after_ttl(tmp_path, now):
+    path = str(tmp_path / 'cache.json')
+    cache = ClassificationCache(path, ttl_days=1)
+    tweet = make_tweet(1, '著作権法の改正案')
+    cache.put(tweet, 'gpt-4o-mini', 'クリエイター')
+    cache.save()
+    assert ClassificationCache(path, ttl_days=1).get(tweet, 'gpt-4o-mini') == 'クリエイター'
+
+    now[0] += DAY + 1
+    assert cache.get(tweet, 'gpt-4o-mini') is None
+    # 読み込み時にも期限切れの分は捨てる
+    assert ClassificationCache(path, ttl_days=1).entries == {}
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, now):
+    path = str(tmp_path / 'cache.json')
+    cache = ClassificationCache(path, max_entries=2)
+    tweets = [make_tweet(i, f'本文{i}') for i in range(3)]
+    for tweet in tweets:
+        now[0] += 1
+        cache.put(tweet, 'gpt-4o-mini', 'その他')
+    now[0] += 1
+    cache.get(tweets[0], 'gpt-4o-mini')
+    cache.save()
+
+    reloaded = ClassificationCache(path, max_entries=2)
+    assert [reloaded.get(tweet, 'gpt-4o-mini') for tweet in tweets] == ['その他', None, 'その他']
+
+
+def test_only_uncached_tweets_reach_the_model(tmp_path):
+    openai_client = FakeOpenAI()
+    path = str(tmp_path / 'cache.json')
+    classifier = TweetClassifier(openai_client, cache=ClassificationCache(path))
+    tweets = [make_tweet(1, '表現の自由を守る'), make_tweet(2, 'マイナンバーカードの件'), make_tweet(3, '猫がかわいい')]
+    expected = {1: '表現の自由', 2: 'デジタル', 3: 'その他'}
+    assert classifier.classify(tweets) == expected
+    assert openai_client.request_count == 1
+
+    # 保存したキャッシュだけで分類でき、AIには問い合わせない
+    classifier = TweetClassifier(openai_client, cache=ClassificationCache(path))
+    assert classifier.classify(tweets) == expected
+    assert openai_client.request_count == 1
+
+    # 新しいツイートと本文が変わったツイートだけを問い合わせる
+    prompts = []
+    create = openai_client.create
+
+    def recording_create(**kwargs):
+        prompts.append(kwargs['messages'][-1]['content'])
+        return create(**kwargs)
+
+    openai_client.chat.completions.create = recording_create
+    edited = make_tweet(3, '参議院の委員会')
+    assert classifier.classify(tweets[:2] + [edited, make_tweet(4, '同人誌即売会')]) == {
+        1: '表現の自由', 2: 'デジタル', 3: '政治活動', 4: 'クリエイター'
+    }
+    assert openai_client.request_count == 2
+    assert '参議院の委員会' in prompts[0] and '同人誌即売会' in prompts[0]
+    assert '表現の自由を守る' not in prompts[0]
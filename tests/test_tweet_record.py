@@ -0,0 +1,43 @@
+from tweet_record import TopK, TweetRecord, engagement_key, relevance_key
+
+
+def make_tweet(tweet_id, likes, retweets=0, relevance_score=None):
+    return TweetRecord(tweet_id, '名前', 'user', '本文', None,
+                       likes=likes, retweets=retweets, relevance_score=relevance_score)
+
+
+def test_keeps_top_k():
+    top = TopK(3, engagement_key)
+    for tweet_id, likes in enumerate([5, 1, 9, 3, 7, 2]):
+        top.push(make_tweet(tweet_id, likes))
+    assert len(top) == 3
+    assert [tweet['likes'] for tweet in top.ranked()] == [9, 7, 5]
+
+
+def test_ties_keep_earlier_record():
+    top = TopK(2, engagement_key)
+    for tweet_id in range(4):
+        top.push(make_tweet(tweet_id, 1))
+    assert [tweet['tweet_id'] for tweet in top.ranked()] == [0, 1]
+
+
+def test_same_tweet_id_is_replaced():
+    top = TopK(2, engagement_key)
+    top.push(make_tweet(1, 10))
+    top.push(make_tweet(2, 5))
+    top.push(make_tweet(1, 1))
+    assert len(top) == 2
+    assert [(tweet['tweet_id'], tweet['likes']) for tweet in top.ranked()] == [(2, 5), (1, 1)]
+    # 押し出された後も、同じtweet_idを再び追加できる
+    top.push(make_tweet(3, 20))
+    top.push(make_tweet(1, 30))
+    assert [tweet['tweet_id'] for tweet in top.ranked()] == [1, 3]
+
+
+def test_relevance_key_orders_by_score_then_engagement():
+    top = TopK(3, relevance_key)
+    top.push(make_tweet(1, 100))
+    top.push(make_tweet(2, 1, relevance_score=2))
+    top.push(make_tweet(3, 50, relevance_score=2))
+    assert [tweet['tweet_id'] for tweet in top.ranked()] == [3, 2, 1]
+
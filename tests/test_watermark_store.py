@@ -0,0 +1,44 @@
+import time
+
+from benchmarks.corpus import snowflake_id
+from watermark_store import WatermarkStore, is_within_window, snowflake_time
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / 'state' / 'watermarks.json'
+    store = WatermarkStore(str(path))
+    assert store.get('accounts', '123') is None
+    store.update('accounts', '123', ['100', 250, '200'])
+    store.update('queries', '山田太郎 議員', [10])
+    store.save()
+
+    reloaded = WatermarkStore(str(path))
+    assert reloaded.get('accounts', '123') == '250'
+    assert reloaded.get('queries', '山田太郎 議員') == '10'
+
+
+def test_update_only_moves_forward(tmp_path):
+    store = WatermarkStore(str(tmp_path / 'watermarks.json'))
+    store.update('accounts', 'a', [500])
+    store.update('accounts', 'a', [400])
+    store.update('accounts', 'a', [])
+    assert store.get('accounts', 'a') == '500'
+    store.update('accounts', 'a', [501])
+    assert store.get('accounts', 'a') == '501'
+
+
+def test_broken_file_is_treated_as_empty(tmp_path):
+    path = tmp_path / 'watermarks.json'
+    path.write_text('{', encoding='utf-8')
+    store = WatermarkStore(str(path))
+    assert store.data == {'accounts': {}, 'queries': {}}
+
+
+def test_window():
+    now = time.time()
+    recent = snowflake_id(now - 86400, 1)
+    old = snowflake_id(now - 10 * 86400, 1)
+    assert abs(snowflake_time(recent).timestamp() - (now - 86400)) < 1
+    assert is_within_window(recent, 7)
+    assert not is_within_window(old, 7)
+    assert not is_within_window(None, 7)
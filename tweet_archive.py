@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+import argparse
+import gzip
+import json
+import mmap
+import os
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import datetime, timezone
+
+import numpy as np
+
+from instrumentation import metrics
+from tweet_record import TweetRecord
+from tweet_store import parse_created_at
+
+# ブロック1つ分の位置（<日付>.idx に追記する固定長レコード）
+INDEX_DTYPE = np.dtype([
+    ('offset', '<i8'),
+    ('length', '<i8'),
+    ('count', '<i4'),
+    ('archived_at', '<f8'),
+])
+
+# 収集したままの値だけを残す（関連度・類似ツイートの合算は実行ごとの判定なので含めない）
+ARCHIVE_FIELDS = (
+    'tweet_id', 'username', 'account_name', 'text', 'created_at',
+    'likes', 'retweets', 'replies', 'search_keyword'
+)
+
+# 1行ごとに json.dumps で作り直さないよう使い回す
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+class TweetArchive:
+    """実行ごとに収集したツイートを投稿日ごとのgzip圧縮JSONLに追記していくアーカイブ
+
+    <directory>/<YYYY-MM>/<YYYY-MM-DD>.jsonl.gz は独立したgzipメンバー（ブロック）を連結したもので、
+    gzip・zcat でもそのまま読める。各ブロックの位置と件数は <YYYY-MM-DD>.idx に記録し、
+    集計時はファイルをメモリマップしてブロックを1つずつ展開する（全件をメモリに載せない）。
+    同じツイートは実行ごとに記録されるので、エンゲージメントの推移も後から追える。
+
+    add() は渡された時点の値を記録に写し取るので、その後ツイートを書き換えても記録は変わらない。
+    """
+
+    def __init__(self, directory='state/archive', block_size=5000, compresslevel=6):
+        # block_size: 1ブロックに入れる最大件数（集計時に一度に展開する量）
+        self.directory = directory
+        self.block_size = block_size
+        self.compresslevel = compresslevel
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def add(self, tweet):
+        """収集したツイート1件を記録に写し取り、block_size件たまったら書き出す"""
+        record = _to_record(tweet)
+        with self._lock:
+            self._pending.append(record)
+            full = len(self._pending) >= self.block_size
+        if full:
+            self.flush()
+
+    def append(self, tweets, archived_at=None):
+        """ツイートをまとめて追記し、追記した件数を返す"""
+        for tweet in tweets:
+            record = _to_record(tweet)
+            with self._lock:
+                self._pending.append(record)
+        return self.flush(archived_at)
+
+    @metrics.timed('archive')
+    def flush(self, archived_at=None):
+        """たまった記録を投稿日のパーティションに書き出し、書き出した件数を返す"""
+        archived_at = time.time() if archived_at is None else archived_at
+        archived_iso = _iso(archived_at)
+        with self._lock:
+            records, self._pending = self._pending, []
+            partitions = {}
+            for record in records:
+                record['archived_at'] = archived_iso
+                day = (record['created_at'] or archived_iso)[:10]
+                partitions.setdefault(day, []).append(record)
+            for day, day_records in partitions.items():
+                for i in range(0, len(day_records), self.block_size):
+                    self._write_block(day, day_records[i:i + self.block_size], archived_at)
+        metrics.count('archived_tweets', len(records))
+        return len(records)
+
+    def _write_block(self, day, records, archived_at):
+        data_path, index_path = self._paths(day)
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+        lines = ''.join(_encoder.encode(record) + '\n' for record in records)
+        block = gzip.compress(lines.encode('utf-8'), compresslevel=self.compresslevel)
+        with open(data_path, 'ab') as f:
+            # 途中で落ちた書き込みの残りがあっても、索引にはファイル末尾からの位置を記録する
+            offset = f.seek(0, os.SEEK_END)
+            f.write(block)
+        entry = np.array([(offset, len(block), len(records), archived_at)], dtype=INDEX_DTYPE)
+        # 索引はデータを書き終えてから追記する（索引にあるブロックは必ず完全）
+        with open(index_path, 'ab') as f:
+            entry.tofile(f)
+
+    def _paths(self, day):
+        base = os.path.join(self.directory, day[:7], day)
+        return f'{base}.jsonl.gz', f'{base}.idx'
+
+    def partitions(self, start=None, end=None):
+        """期間内（両端を含む 'YYYY-MM-DD'）のパーティションの日付を古い順に返す"""
+        days = []
+        try:
+            months = sorted(os.listdir(self.directory))
+        except FileNotFoundError:
+            return days
+        for month in months:
+            if (start and month < start[:7]) or (end and month > end[:7]):
+                continue
+            for name in sorted(os.listdir(os.path.join(self.directory, month))):
+                if not name.endswith('.idx'):
+                    continue
+                day = name[:-len('.idx')]
+                if (start and day < start) or (end and day > end):
+                    continue
+                days.append(day)
+        return days
+
+    def scan(self, start=None, end=None):
+        """期間内の記録を1件ずつ返す（同じツイートは実行の回数だけ現れる）"""
+        for day in self.partitions(start, end):
+            for block in self._iter_blocks(day):
+                for line in block.splitlines():
+                    yield json.loads(line)
+
+    def latest(self, start=None, end=None):
+        """期間内のツイートを最後に記録した時点の値で1件ずつ返す
+
+        ツイートは常に投稿日のパーティションに入るので、重複除外は1日分ずつ行えば足りる。
+        """
+        for day in self.partitions(start, end):
+            records = {}
+            for block in self._iter_blocks(day):
+                for line in block.splitlines():
+                    record = json.loads(line)
+                    records[record['tweet_id']] = record
+            yield from records.values()
+
+    def _iter_blocks(self, day):
+        """1日分のブロックを展開したバイト列を順に返す"""
+        data_path, index_path = self._paths(day)
+        index = np.fromfile(index_path, dtype=INDEX_DTYPE)
+        if not len(index):
+            return
+        with open(data_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for offset, length in zip(index['offset'].tolist(), index['length'].tolist()):
+                # gzipメンバー1つだけを展開（wbits=31 でgzipヘッダーを扱う）
+                yield zlib.decompress(data[offset:offset + length], wbits=31)
+
+    def keyword_counts_by_day(self, start=None, end=None, field='search_keyword'):
+        """日付ごと・キーワードごとのツイート数（{日付: Counter}）"""
+        counts = {}
+        for record in self.latest(start, end):
+            values = record.get(field)
+            if not isinstance(values, list):
+                values = [values or 'その他']
+            counts.setdefault(record['created_at'][:10] if record['created_at'] else '', Counter()).update(values)
+        return counts
+
+    def top_authors(self, start=None, end=None, limit=20):
+        """期間内のツイート数が多い投稿者（(ユーザー名, ツイート数, いいね+RT合計) のリスト）"""
+        tweets = Counter()
+        engagement = Counter()
+        for record in self.latest(start, end):
+            tweets[record['username']] += 1
+            engagement[record['username']] += record['likes'] + record['retweets']
+        return [(username, count, engagement[username]) for username, count in tweets.most_common(limit)]
+
+
+def _to_record(tweet):
+    """TweetRecord・辞書のどちらからも同じ形の記録を作る"""
+    if isinstance(tweet, TweetRecord):
+        # 未設定の任意項目は None なので属性を直接読む
+        record = {field: getattr(tweet, field) for field in ARCHIVE_FIELDS}
+    else:
+        record = {field: tweet.get(field) for field in ARCHIVE_FIELDS}
+    record['tweet_id'] = str(record['tweet_id'])
+    created_at = parse_created_at(record['created_at'])
+    record['created_at'] = created_at.isoformat() if created_at else None
+    return record
+
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec='seconds')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='アーカイブしたツイートの集計')
+    parser.add_argument('--since', default=None, help='集計開始日（YYYY-MM-DD）')
+    parser.add_argument('--until', default=None, help='集計終了日（YYYY-MM-DD）')
+    parser.add_argument('--directory', default='state/archive')
+    parser.add_argument('--field', default='search_keyword',
+                        help='日別に数える項目（search_keyword・username など）')
+    parser.add_argument('--top', type=int, default=20, help='表示する投稿者数')
+    args = parser.parse_args(argv)
+
+    archive = TweetArchive(args.directory)
+    print(f"=== 日別・{args.field}別ツイート数 ===")
+    for day, counts in sorted(archive.keyword_counts_by_day(args.since, args.until, args.field).items()):
+        print(f"{day}: " + ", ".join(f"{keyword} {count}件" for keyword, count in counts.most_common()))
+    print(f"=== 投稿者（上位{args.top}件） ===")
+    for username, count, engagement in archive.top_authors(args.since, args.until, args.top):
+        print(f"@{username}: {count}件（いいね+RT {engagement}）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+import hashlib
+import json
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import metrics
+from local_classifier import LocalClassifier
+
+# レポートの分野（キー, 見出し）
+CATEGORIES = [
+    ('表現の自由', '📝 表現の自由・規制関連'),
+    ('デジタル', '💻 デジタル・IT政策'),
+    ('クリエイター', '🎨 クリエイター・コンテンツ'),
+    ('法案', '⚖️ 法案・政策提案'),
+    ('政治活動', '🗳️ 政治活動・選挙'),
+    ('その他', '📊 その他'),
+]
+CATEGORY_KEYS = [key for key, _ in CATEGORIES]
+# 分野別レポートのファイル名
+CATEGORY_SLUGS = {
+    '表現の自由': 'expression',
+    'デジタル': 'digital',
+    'クリエイター': 'creator',
+    '法案': 'bills',
+    '政治活動': 'politics',
+    'その他': 'other',
+}
+
+
+class ClassificationCache:
+    """ツイートごとの分類結果をtweet_id・本文・モデルのハッシュで保存するキャッシュ"""
+
+    def __init__(self, path='state/classification_cache.json', ttl_days=14, max_entries=5000):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.max_entries = max_entries
+        self.entries = self.load()
+
+    def load(self):
+        """保存済みの分類結果を読み込み（期限切れは除外）"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        now = time.time()
+        return {key: entry for key, entry in entries.items() if entry['expires_at'] > now}
+
+    def save(self):
+        """上限件数を超えた分は最終利用が古い順に削除して書き出し"""
+        if len(self.entries) > self.max_entries:
+            newest = sorted(self.entries.items(), key=lambda item: item[1]['last_used'], reverse=True)
+            self.entries = dict(newest[:self.max_entries])
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def key(tweet, model):
+        return hashlib.sha256(f"{tweet['tweet_id']}\n{tweet['text']}\n{model}".encode('utf-8')).hexdigest()
+
+    def get(self, tweet, model):
+        """キャッシュ済みの分野（なければNone）"""
+        entry = self.entries.get(self.key(tweet, model))
+        now = time.time()
+        if entry is None or entry['expires_at'] <= now:
+            return None
+        entry['last_used'] = now
+        return entry['category']
+
+    def examples(self):
+        """ローカル分類器の学習用に (本文, 分野) のリストを返す"""
+        return [(entry['text'], entry['category']) for entry in self.entries.values() if 'text' in entry]
+
+    def put(self, tweet, model, category):
+        now = time.time()
+        self.entries[self.key(tweet, model)] = {
+            'category': category,
+            'text': tweet['text'],
+            'expires_at': now + self.ttl,
+            'last_used': now
+        }
+
+
+class TweetClassifier:
+    """ツイートを6分野に分類（キャッシュになく、ローカル分類器でも確信が持てないものだけAIに問い合わせる）"""
+
+    def __init__(self, openai_client, cache=None, local_classifier=None, model='gpt-4o-mini',
+                 max_prompt_tokens=6000, max_batch_size=50, max_workers=4, max_retries=3, subject='山田太郎議員'):
+        # max_prompt_tokens: 1回の問い合わせに含めるツイートのトークン数の目安
+        # max_batch_size: 1回の問い合わせに含める最大件数（回答のJSONが収まる範囲）
+        # subject: プロンプトで示す監視対象の名前
+        self.openai_client = openai_client
+        self.cache = cache if cache is not None else ClassificationCache()
+        self.local_classifier = local_classifier if local_classifier is not None else LocalClassifier(CATEGORY_KEYS)
+        self.model = model
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_batch_size = max_batch_size
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.subject = subject
+
+    @metrics.timed('classify')
+    def classify(self, tweets):
+        """tweet_id → 分野 の辞書を返す"""
+        categories = {}
+        uncached = []
+        for tweet in tweets:
+            category = self.cache.get(tweet, self.model)
+            if category is None:
+                uncached.append(tweet)
+            else:
+                categories[tweet['tweet_id']] = category
+        cached_count = len(categories)
+
+        local = self.classify_locally(uncached)
+        categories.update(local)
+        uncached = [tweet for tweet in uncached if tweet['tweet_id'] not in local]
+
+        batches = self.make_batches(uncached)
+        metrics.count('classification_cache_hits', cached_count)
+        metrics.count('classification_local', len(local))
+        metrics.count('classification_cache_misses', len(uncached))
+        print(f"AI分類: キャッシュ済み{cached_count}件 / ローカル{len(local)}件 / 新規{len(uncached)}件（{len(batches)}回に分割）")
+        if batches:
+            # バッチを並列に分類し、入力順に結果をまとめる
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                results = list(executor.map(self._classify_batch, batches))
+            if all(result is None for result in results):
+                raise RuntimeError("全てのバッチの分類に失敗しました")
+            for batch, result in zip(batches, results):
+                if result is None:
+                    continue
+                for tweet, category in zip(batch, result):
+                    self.cache.put(tweet, self.model, category)
+                    categories[tweet['tweet_id']] = category
+        self.cache.save()
+        return categories
+
+    def classify_locally(self, tweets):
+        """ローカル分類器で確信度の高いツイートだけを分類（結果はAIの学習データと混ざらないようキャッシュしない）"""
+        if not tweets:
+            return {}
+        examples = self.cache.examples()
+        if len(examples) != self.local_classifier.trained_size:
+            self.local_classifier.fit(examples)
+        if not self.local_classifier.ready:
+            return {}
+        predicted, confident = self.local_classifier.predict([tweet['text'] for tweet in tweets])
+        return {
+            tweet['tweet_id']: category
+            for tweet, category, is_confident in zip(tweets, predicted, confident) if is_confident
+        }
+
+    def make_batches(self, tweets):
+        """トークン数と件数の上限に収まるようにツイートを分割"""
+        batches = []
+        batch = []
+        batch_tokens = 0
+        for tweet in tweets:
+            tokens = estimate_tokens(tweet['text']) + estimate_tokens(tweet['username']) + 8
+            if batch and (batch_tokens + tokens > self.max_prompt_tokens or len(batch) >= self.max_batch_size):
+                batches.append(batch)
+                batch = []
+                batch_tokens = 0
+            batch.append(tweet)
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _classify_batch(self, tweets):
+        """1バッチを分類（失敗時は指数バックオフで再試行、最終的に失敗したらNone）"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self._classify_with_model(tweets)
+            except Exception as e:
+                metrics.count('openai_errors')
+                if attempt == self.max_retries:
+                    print(f"AI分類エラー（{len(tweets)}件）: {e}")
+                    return None
+                time.sleep(2 ** attempt + random.random())
+
+    def _classify_with_model(self, tweets):
+        """AIで分類（入力と同じ順で分野を返す）"""
+        tweet_texts = [
+            f"{i}. @{tweet['username']}: {' '.join(tweet['text'].split())}"
+            for i, tweet in enumerate(tweets, 1)
+        ]
+        prompt = f"""以下は{self.subject}に関連するツイートです。
+手動チェックの効率化のため、各ツイートを次の分野のいずれか1つに分類してください。
+
+分野: {', '.join(CATEGORY_KEYS)}
+
+ツイート番号をキー、分野名を値とするJSONオブジェクトだけを返してください。
+例: {{"1": "表現の自由", "2": "その他"}}
+
+ツイート一覧：
+{chr(10).join(tweet_texts)}"""
+
+        response = self.openai_client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=20 + 16 * len(tweets),
+            temperature=0,
+            response_format={"type": "json_object"}
+        )
+        metrics.count('openai_requests')
+        metrics.record_usage(getattr(response, 'usage', None))
+        answer = json.loads(response.choices[0].message.content)
+        return [
+            answer.get(str(i)) if answer.get(str(i)) in CATEGORY_KEYS else 'その他'
+            for i in range(1, len(tweets) + 1)
+        ]
+
+
+def iter_sections(tweets, categories):
+    """分野別ツイート一覧のMarkdownを見出し・分野ごとの断片で返す（レポートへ逐次書き出す用）"""
+    sections = {key: [] for key in CATEGORY_KEYS}
+    for tweet in tweets:
+        category = categories.get(tweet['tweet_id'], 'その他')
+        relevance = f" (関連度: {tweet['relevance_score']})" if 'relevance_score' in tweet else ""
+        sections[category].append(
+            f"- @{tweet['username']}: {' '.join(tweet['text'].split())} "
+            f"(👍{tweet['likes']} 🔄{tweet['retweets']}){relevance}"
+        )
+
+    yield "## 分野別ツイート一覧\n\n"
+    for key, title in CATEGORIES:
+        yield "\n".join([f"### {title}", *(sections[key] or ["- 該当なし"]), "", ""])
+
+
+def estimate_tokens(text):
+    """トークン数の概算（日本語は1文字1トークン前後、英数字は4文字1トークン前後）"""
+    ascii_chars = sum(1 for char in text if char.isascii())
+    return len(text) - ascii_chars + ascii_chars // 4 + 1
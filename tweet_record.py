@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+import heapq
+import sys
+from array import array
+
+
+class TweetRecord:
+    """収集したツイート1件（辞書と同じく tweet['likes'] のようにも参照できる）
+
+    投稿者名・キーワードは sys.intern で共有し、URLは必要なときに組み立てる。
+    relevance_score などの任意項目は None のとき 'relevance_score' in tweet が偽になる。
+    """
+
+    __slots__ = (
+        'tweet_id', 'account_name', 'username', 'text', 'created_at',
+        'likes', 'retweets', 'replies', 'search_keyword',
+        'relevance_score', 'relevance_categories', 'duplicate_count', 'category'
+    )
+    OPTIONAL_FIELDS = ('search_keyword', 'relevance_score', 'relevance_categories', 'duplicate_count', 'category')
+
+    def __init__(self, tweet_id, account_name, username, text, created_at,
+                 likes=0, retweets=0, replies=0, search_keyword=None,
+                 relevance_score=None, relevance_categories=None, duplicate_count=None, category=None):
+        self.tweet_id = int(tweet_id)
+        self.account_name = _intern(account_name)
+        self.username = _intern(username)
+        self.text = text
+        self.created_at = created_at
+        self.likes = likes
+        self.retweets = retweets
+        self.replies = replies
+        self.search_keyword = _intern(search_keyword)
+        self.relevance_score = relevance_score
+        self.relevance_categories = relevance_categories
+        # 近い本文をまとめた代表なら、まとめた件数（エンゲージメントは合算済み）
+        self.duplicate_count = duplicate_count
+        # AI（またはローカル分類器）が付けたレポートの分野
+        self.category = category
+
+    @classmethod
+    def from_tweepy(cls, tweet, username, account_name, search_keyword):
+        """tweepy（API v2）のツイートから作成"""
+        metrics = tweet.public_metrics
+        return cls(
+            tweet.id, account_name, username, tweet.text, tweet.created_at,
+            metrics['like_count'], metrics['retweet_count'], metrics['reply_count'],
+            search_keyword
+        )
+
+    @classmethod
+    def from_twikit(cls, tweet, search_keyword):
+        """twikitのツイートから作成"""
+        return cls(
+            tweet.id, tweet.user.name, tweet.user.screen_name, tweet.text, tweet.created_at,
+            tweet.favorite_count, tweet.retweet_count, tweet.reply_count or 0,
+            search_keyword
+        )
+
+    @property
+    def url(self):
+        return f"https://twitter.com/{self.username}/status/{self.tweet_id}"
+
+    def __getitem__(self, key):
+        if key != 'url' and key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        if key in self.OPTIONAL_FIELDS:
+            return getattr(self, key) is not None
+        return key == 'url' or key in self.__slots__
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def keys(self):
+        return [key for key in self.__slots__ + ('url',) if key in self]
+
+    def copy(self):
+        """同じ値を持つ別のレコード（辞書の copy() と同じく浅いコピー）"""
+        record = TweetRecord.__new__(TweetRecord)
+        for key in self.__slots__:
+            setattr(record, key, getattr(self, key))
+        return record
+
+    def to_dict(self):
+        """JSONなどに書き出すための辞書"""
+        return {key: self[key] for key in self.keys()}
+
+    def __repr__(self):
+        return f"TweetRecord(@{self.username}/{self.tweet_id}, 👍{self.likes} 🔄{self.retweets})"
+
+
+class TweetBatch:
+    """ツイートの一覧を列ごとの配列で持ち、エンゲージメントでの絞り込み・並べ替えをまとめて行う"""
+
+    def __init__(self, records):
+        self.records = list(records)
+        self.tweet_ids = array('q', (record['tweet_id'] for record in self.records))
+        self.likes = array('q', (record['likes'] for record in self.records))
+        self.retweets = array('q', (record['retweets'] for record in self.records))
+        self.replies = array('q', (record['replies'] for record in self.records))
+
+    def __len__(self):
+        return len(self.records)
+
+    def engagement(self):
+        """いいね数+RT数の列"""
+        return array('q', map(int.__add__, self.likes, self.retweets))
+
+    def where(self, likes=None, retweets=None, replies=None):
+        """いずれかの下限を満たす行だけのバッチ（指定がなければ全件）"""
+        conditions = [
+            (column, minimum)
+            for column, minimum in ((self.likes, likes), (self.retweets, retweets), (self.replies, replies))
+            if minimum is not None
+        ]
+        if not conditions:
+            return self
+        return TweetBatch(
+            record for i, record in enumerate(self.records)
+            if any(column[i] >= minimum for column, minimum in conditions)
+        )
+
+    def ranked(self, limit=None):
+        """エンゲージメント順（同点は元の順）のレコード"""
+        engagement = self.engagement()
+        if limit is None:
+            order = sorted(range(len(self.records)), key=engagement.__getitem__, reverse=True)
+        else:
+            order = heapq.nlargest(limit, range(len(self.records)), key=engagement.__getitem__)
+        return [self.records[i] for i in order]
+
+
+class TopK:
+    """スコア上位k件だけを保持する（メモリはk件分で一定）"""
+
+    def __init__(self, k, key):
+        self.k = k
+        self.key = key
+        self._heap = []
+        self._members = {}
+        self._count = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, record):
+        """追加（同じtweet_idが既にあればスコアを更新）"""
+        tweet_id = record['tweet_id']
+        if tweet_id in self._members:
+            self._heap.remove(self._members.pop(tweet_id))
+            heapq.heapify(self._heap)
+        # 同点は先に来たものを優先（連番を逆順にして比較）
+        self._count += 1
+        entry = (self.key(record), -self._count, record)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry[:2] > self._heap[0][:2]:
+            del self._members[heapq.heapreplace(self._heap, entry)[2]['tweet_id']]
+        else:
+            return
+        self._members[tweet_id] = entry
+
+    def ranked(self):
+        """スコアの高い順のレコード"""
+        return [entry[2] for entry in sorted(self._heap, key=lambda entry: entry[:2], reverse=True)]
+
+
+def engagement_key(record):
+    return record['likes'] + record['retweets']
+
+
+def relevance_key(record):
+    """関連度順（同点はエンゲージメント順）"""
+    return (record.get('relevance_score') or 0, record['likes'] + record['retweets'])
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
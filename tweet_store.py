@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+
+from tweet_record import TweetRecord
+
+COLUMNS = [
+    'tweet_id', 'source', 'account_name', 'username', 'text', 'created_at',
+    'likes', 'retweets', 'replies', 'search_keyword', 'relevance_score'
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tweets (
+    tweet_id INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    account_name TEXT,
+    username TEXT,
+    text TEXT,
+    created_at TEXT,
+    likes INTEGER NOT NULL DEFAULT 0,
+    retweets INTEGER NOT NULL DEFAULT 0,
+    replies INTEGER NOT NULL DEFAULT 0,
+    search_keyword TEXT,
+    relevance_score INTEGER,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (tweet_id, source)
+);
+CREATE INDEX IF NOT EXISTS idx_tweets_username ON tweets (username);
+CREATE INDEX IF NOT EXISTS idx_tweets_created_at ON tweets (source, created_at);
+CREATE INDEX IF NOT EXISTS idx_tweets_search_keyword ON tweets (search_keyword);
+CREATE TABLE IF NOT EXISTS target_relevance (
+    target TEXT NOT NULL,
+    tweet_id INTEGER NOT NULL,
+    relevance_score INTEGER NOT NULL,
+    PRIMARY KEY (target, tweet_id)
+);
+"""
+
+UPSERT = f"""
+INSERT INTO tweets ({', '.join(COLUMNS)}, updated_at)
+VALUES ({', '.join('?' for _ in COLUMNS)}, ?)
+ON CONFLICT (tweet_id, source) DO UPDATE SET
+    likes = excluded.likes,
+    retweets = excluded.retweets,
+    replies = excluded.replies,
+    relevance_score = COALESCE(excluded.relevance_score, tweets.relevance_score),
+    updated_at = excluded.updated_at
+"""
+
+
+class TweetStore:
+    """tweet_idをキーに収集したツイートを保存するSQLiteストア"""
+
+    def __init__(self, path='state/tweets.db', batch_size=500):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.batch_size = batch_size
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        # 収集スレッドと集計側から同じ接続を使うので、1回の読み書きごとに排他する
+        self._lock = threading.RLock()
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+
+    def upsert_tweets(self, source, tweets):
+        """ツイートをまとめて保存（既存のtweet_idはエンゲージメントを更新）"""
+        now = datetime.now(timezone.utc).isoformat()
+        for i in range(0, len(tweets), self.batch_size):
+            rows = [
+                self._to_row(source, tweet) + (now,)
+                for tweet in tweets[i:i + self.batch_size]
+            ]
+            with self._lock, self.conn:
+                self.conn.executemany(UPSERT, rows)
+
+    def update_relevance(self, tweets, target=None):
+        """フィルタリングで付けた関連度を保存"""
+        self.save_relevance(
+            [(tweet['relevance_score'], int(tweet['tweet_id'])) for tweet in tweets if 'relevance_score' in tweet],
+            target
+        )
+
+    def save_relevance(self, rows, target=None):
+        """(関連度, tweet_id) の組を保存（target を指定すると監視対象ごとの表に保存）"""
+        with self._lock, self.conn:
+            if target is None:
+                self.conn.executemany('UPDATE tweets SET relevance_score = ? WHERE tweet_id = ?', rows)
+            else:
+                self.conn.executemany(
+                    'INSERT OR REPLACE INTO target_relevance (target, tweet_id, relevance_score) VALUES (?, ?, ?)',
+                    [(target, tweet_id, score) for score, tweet_id in rows]
+                )
+
+    def iter_recent_chunks(self, source, days_back, chunk_size=500):
+        """期間内に保存済みのツイートをtweet_id順にchunk_size件ずつのリストで読み出す
+
+        読み出しの合間に同じツイートを更新しても、続きはtweet_idから再開するので重複しない
+        """
+        cutoff = _cutoff(days_back)
+        last_id = -1
+        while True:
+            with self._lock:
+                rows = self.conn.execute(
+                    'SELECT * FROM tweets WHERE source = ? AND created_at >= ? AND tweet_id > ? '
+                    'ORDER BY tweet_id LIMIT ?',
+                    (source, cutoff, last_id, chunk_size)
+                ).fetchall()
+            if not rows:
+                return
+            yield [self._to_tweet(row) for row in rows]
+            last_id = rows[-1]['tweet_id']
+
+    def top_tweets(self, source, days_back, limit=10, relevant_only=False, thresholds=None, tweet_ids=None):
+        """関連度・エンゲージメント順の上位ツイート
+
+        thresholds: {'likes': 1, 'retweets': 1} のようにいずれかを満たすツイートに絞る
+        tweet_ids: 指定したtweet_idのツイートだけに絞る（類似ツイートの代表など）
+        """
+        query = 'SELECT * FROM tweets WHERE source = ? AND created_at >= ?'
+        params = [source, _cutoff(days_back)]
+        if tweet_ids is not None:
+            # 件数が多くてもSQLの変数の上限にかからないよう、JSONの配列1つで渡す
+            query += ' AND tweet_id IN (SELECT value FROM json_each(?))'
+            params.append(json.dumps([int(tweet_id) for tweet_id in tweet_ids]))
+        if relevant_only:
+            query += ' AND relevance_score > 0'
+        if thresholds:
+            conditions = []
+            for column, minimum in thresholds.items():
+                if column not in ('likes', 'retweets', 'replies'):
+                    raise ValueError(f"Unknown engagement column: {column}")
+                conditions.append(f'{column} >= ?')
+                params.append(minimum)
+            query += f" AND ({' OR '.join(conditions)})"
+        query += ' ORDER BY COALESCE(relevance_score, 0) DESC, likes + retweets DESC, tweet_id DESC LIMIT ?'
+        params.append(limit)
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return [self._to_tweet(row) for row in rows]
+
+    def close(self):
+        self.conn.close()
+
+    def _to_row(self, source, tweet):
+        created_at = parse_created_at(tweet['created_at'])
+        return (
+            int(tweet['tweet_id']), source, tweet['account_name'], tweet['username'],
+            tweet['text'], created_at.isoformat() if created_at else None,
+            tweet['likes'], tweet['retweets'], tweet['replies'],
+            tweet.get('search_keyword'), tweet.get('relevance_score')
+        )
+
+    def _to_tweet(self, row):
+        return TweetRecord(
+            row['tweet_id'], row['account_name'], row['username'], row['text'],
+            datetime.fromisoformat(row['created_at']) if row['created_at'] else None,
+            row['likes'], row['retweets'], row['replies'],
+            row['search_keyword'], row['relevance_score']
+        )
+
+def parse_created_at(value):
+    """tweepyのdatetime・twikitの文字列どちらもUTCのdatetimeに変換"""
+    if isinstance(value, str):
+        try:
+            value = datetime.strptime(value, '%a %b %d %H:%M:%S %z %Y')
+        except ValueError:
+            try:
+                value = datetime.fromisoformat(value)
+            except ValueError:
+                return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _cutoff(days_back):
+    return (datetime.now(timezone.utc) - timedelta(days=days_back)).isoformat()
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+import tweepy
+
+from instrumentation import metrics
+from rate_limiter import RateLimiter, endpoint_key
+
+
+class RateLimitedClient(tweepy.Client):
+    """RateLimiterでリクエストを調整するtweepy.Client"""
+
+    def __init__(self, *args, rate_limiter=None, max_retries=3, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.max_retries = max_retries
+
+    def request(self, method, route, params=None, json=None, user_auth=False):
+        key = endpoint_key(method, route)
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire(key)
+            metrics.count('twitter_api_calls')
+            metrics.count(f'twitter_api_calls[{key}]')
+            try:
+                response = super().request(method, route, params=params, json=json, user_auth=user_auth)
+            except tweepy.TooManyRequests as e:
+                metrics.count('twitter_rate_limited')
+                self.rate_limiter.update_from_headers(key, e.response.headers, limited=True)
+                if attempt == self.max_retries:
+                    raise
+                continue
+            self.rate_limiter.update_from_headers(key, response.headers)
+            return response
@@ -1,155 +1,237 @@
 #!/usr/bin/env python3
-import tweepy
-import openai
-import json
 import os
+import time
 from datetime import datetime, timedelta
 from collections import defaultdict
-import markdown
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from rate_limiter import RateLimiter
+from watermark_store import WatermarkStore, is_within_window
+from tweet_store import TweetStore
+from near_duplicates import collapse_near_duplicates
+from snapshot_store import SnapshotStore, rank_by_velocity
+from tweet_archive import TweetArchive
+from targets import load_targets, merge_accounts, merge_values
+from tweet_classifier import TweetClassifier, iter_sections
+from report_writer import write_report, write_variants
+from report_index import index_report
+from user_cache import UserCache
+from follower_scanner import FollowerScanner
+from tweet_record import TweetRecord, TweetBatch
+from instrumentation import metrics
+from query_planner import plan_queries, plan_account_queries, match_keywords
+
+# recent search で検索できる日数
+RECENT_SEARCH_DAYS = 7
 
 class TwitterSupporterAnalyzer:
-    def __init__(self):
+    def __init__(self, max_workers=8, watermark_path='state/watermarks.json', store_path='state/tweets.db',
+                 user_cache=None, search_page_budget=10, collection_mode='search', max_pages_per_query=10,
+                 twitter_client=None, openai_client=None, snapshot_store=None, engagement_refresh_interval=0,
+                 targets=None, tweet_archive=None):
+        # twitter_client / openai_client: 指定しなければ環境変数の認証情報で作成（ベンチマークでは偽のクライアントを渡す）
+        # engagement_refresh_interval: 前回までの取得分のエンゲージメントを更新する最短間隔（秒、常駐モード用）
+        # targets: 監視対象の一覧（指定しなければ targets.json、なければ山田太郎議員のみ）。
+        #          収集は全対象分をまとめて行う。generate_report は監視対象が1件のときだけ使える
+        self.targets = targets or load_targets()
+        self.target = self.targets[0]
         self.twitter_bearer_token = os.getenv('TWITTER_BEARER_TOKEN')
         self.openai_api_key = os.getenv('OPENAI_API_KEY')
         
-        # Twitter API v2 client
-        self.twitter_client = tweepy.Client(bearer_token=self.twitter_bearer_token)
+        # Twitter API v2 client（レート制限ヘッダーに合わせてリクエストを調整）
+        self.max_workers = max_workers
+        self.search_page_budget = search_page_budget  # 1回の実行で検索するページ数の上限
+        # アカウントのツイート収集方法（'search': from:でまとめて検索 / 'timeline': 1アカウントずつ取得）
+        self.collection_mode = collection_mode
+        self.max_pages_per_query = max_pages_per_query
+        if twitter_client is None:
+            # tweepy（requests）は読み込みが遅いので、クライアントを作るときに読み込む
+            from twitter_api_client import RateLimitedClient
+            twitter_client = RateLimitedClient(
+                bearer_token=self.twitter_bearer_token,
+                rate_limiter=RateLimiter(burst=max_workers)
+            )
+        self.twitter_client = twitter_client
+        self.rate_limiter = getattr(twitter_client, 'rate_limiter', None) or RateLimiter(burst=max_workers)
         
         # OpenAI client
-        from openai import OpenAI
-        self.openai_client = OpenAI(api_key=self.openai_api_key)
+        if openai_client is None:
+            from openai import OpenAI
+            openai_client = OpenAI(api_key=self.openai_api_key)
+        self.openai_client = openai_client
+        self.tweet_classifier = TweetClassifier(self.openai_client, subject='、'.join(target.name for target in self.targets))
         
-        # 支援者アカウントリスト（設定ファイルから読み込み）
-        self.supporter_accounts = self.load_supporter_accounts()
-    
-    def load_supporter_accounts(self):
-        """支援者アカウントリストを設定ファイルから読み込み"""
-        try:
-            with open('supporter_accounts.json', 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return []
+        # 差分取得用のウォーターマーク（前回取得した最大tweet_id）
+        self.watermarks = WatermarkStore(watermark_path)
+        
+        # 収集したツイートの保存先（実行をまたいで重複排除）
+        self.tweet_store = TweetStore(store_path)
+        
+        # 投稿者プロフィールのキャッシュ（twikit版と共有可能）
+        self.user_cache = user_cache if user_cache is not None else UserCache()
+        
+        # 実行ごとのエンゲージメントの記録（伸び順の表示に使う、twikit版と共有可能）
+        self.snapshot_store = snapshot_store if snapshot_store is not None else SnapshotStore()
+        self.engagement_refresh_interval = engagement_refresh_interval
+        self._engagement_refreshed_at = {}
+        
+        # 収集したツイートを投稿日ごとに圧縮して残す（後からの集計用）
+        self.tweet_archive = tweet_archive if tweet_archive is not None else TweetArchive()
+        
+        # フォロワーの走査位置と上位候補（実行ごとに続きから走査）
+        self.follower_scanner = FollowerScanner(self.twitter_client)
+        
+        # 関連キーワードの照合器（キーワードセットごとに1回だけ構築）
+        self.keyword_matcher = self.target.keyword_matcher
+        
+        # 支援者アカウントリスト（全監視対象の分を重複なしでまとめる）
+        self.supporter_accounts = merge_accounts(target.accounts for target in self.targets)
     
-    def get_active_followers(self, user_id="362083895", limit=50):
-        """山田太郎議員のフォロワーから活発なアカウントを取得"""
+    @metrics.timed('follower_scan')
+    def get_active_followers(self, user_id=None):
+        """監視対象本人のフォロワーから活発なアカウントを取得（前回の続きから走査）"""
+        user_id = user_id or self.target.user_id
+        names = {target.user_id: target.name for target in self.targets}
         try:
-            print("山田太郎議員のフォロワーを取得中...")
-            
-            # フォロワー取得
-            followers = tweepy.Paginator(
-                self.twitter_client.get_users_followers,
-                id=user_id,
-                user_fields=['username', 'name', 'public_metrics', 'verified'],
-                max_results=100
-            ).flatten(limit=limit)
+            print(f"{names.get(user_id, user_id)}のフォロワーを取得中...")
             
-            active_supporters = []
-            for user in followers:
+            def cache_user(user):
                 metrics = user.public_metrics
+                self.user_cache.put(
+                    user.id, user.username, user.name,
+                    followers=metrics['followers_count'],
+                    following=metrics['following_count'],
+                    tweet_count=metrics['tweet_count']
+                )
+            
+            def is_active(user):
                 # 活発なアカウントの条件
-                if (metrics['followers_count'] >= 100 and 
-                    metrics['following_count'] >= 50 and 
-                    metrics['tweet_count'] >= 100):
-                    
-                    active_supporters.append({
-                        'name': user.name,
-                        'username': user.username,
-                        'user_id': str(user.id),
-                        'followers': metrics['followers_count'],
-                        'description': '自動検出された支援者'
-                    })
+                metrics = user.public_metrics
+                return (metrics['followers_count'] >= 100 and 
+                        metrics['following_count'] >= 50 and 
+                        metrics['tweet_count'] >= 100)
             
-            # フォロワー数順にソート
-            active_supporters.sort(key=lambda x: x['followers'], reverse=True)
-            print(f"活発な支援者 {len(active_supporters)}名を発見")
+            # フォロワー数の多い順に上位を保持
+            candidates = self.follower_scanner.scan(
+                user_id,
+                is_candidate=is_active,
+                score=lambda user: user.public_metrics['followers_count'],
+                on_user=cache_user
+            )
+            self.user_cache.save()
+            
+            active_supporters = [
+                dict(candidate, description='自動検出された支援者') for candidate in candidates
+            ]
+            scan_state = self.follower_scanner.state[str(user_id)]
+            print(f"活発な支援者 {len(active_supporters)}名を発見"
+                  f"（走査済み{scan_state['scanned']}名 / {scan_state['passes']}周）")
             
-            return active_supporters[:20]  # 上位20名を返す
+            return active_supporters
             
         except Exception as e:
             print(f"フォロワー取得エラー: {e}")
             return []
 
+    @metrics.timed('keyword_search')
     def search_keyword_tweets(self, days_back=3):
         """キーワード検索でツイートを収集"""
+        # tweepy（requests）は読み込みが遅いので、使うときに読み込む
+        import tweepy
+        
         end_time = datetime.now() - timedelta(seconds=30)  # 30秒前に設定
         start_time = end_time - timedelta(days=days_back)
         
-        search_keywords = [
-            '山田太郎 議員',
-            '表現の自由 山田太郎'
-        ]
+        # 全監視対象のクエリを重複なしでまとめる
+        search_keywords = merge_values(target.search_queries for target in self.targets)
         
-        viral_tweets = []
+        fetched_tweets = []
+        pages_left = self.search_page_budget
         
-        for i, keyword in enumerate(search_keywords):
+        # キーワードをOR結合したクエリにまとめ、1ページ100件で取得
+        for query, keywords in plan_queries(search_keywords):
+            if pages_left <= 0:
+                print("検索ページ数の上限に達しました")
+                break
             try:
-                print(f"検索中: {keyword}")
+                print(f"検索中: {query}")
                 
-                # API制限を避けるため間隔を空ける
-                if i > 0:
-                    import time
-                    time.sleep(5)
+                # 前回取得分より新しいツイートだけを検索
+                since_id = self.watermarks.get('queries', query)
+                if not is_within_window(since_id, days_back):
+                    since_id = None
                 
-                # キーワード検索（より簡単なクエリ）
-                tweets = self.twitter_client.search_recent_tweets(
-                    query=f'{keyword} -is:retweet lang:ja',
+                pages = tweepy.Paginator(
+                    self.twitter_client.search_recent_tweets,
+                    query=query,
                     tweet_fields=['public_metrics', 'created_at', 'author_id'],
                     user_fields=['username', 'name'],
                     expansions=['author_id'],
-                    max_results=10
+                    max_results=100,
+                    since_id=since_id,
+                    limit=pages_left
                 )
                 
-                if tweets.data:
+                query_tweet_ids = []
+                next_token = None
+                for tweets in pages:
+                    pages_left -= 1
+                    next_token = (tweets.meta or {}).get('next_token')
+                    
+                    # 投稿者情報をキャッシュに登録（ツイートごとの線形探索をしない）
+                    if tweets.includes and 'users' in tweets.includes:
+                        for user in tweets.includes['users']:
+                            self.user_cache.put(user.id, user.username, user.name)
+                    
+                    if not tweets.data:
+                        continue
                     for tweet in tweets.data:
-                        metrics = tweet.public_metrics
-                        # 注目ツイート判定（いいね1以上 または RT1以上）
-                        if metrics['like_count'] >= 1 or metrics['retweet_count'] >= 1:
-                            # ユーザー情報を取得
-                            user = None
-                            if tweets.includes and 'users' in tweets.includes:
-                                user = next((user for user in tweets.includes['users'] if user.id == tweet.author_id), None)
-                            username = user.username if user else 'unknown'
-                            name = user.name if user else 'Unknown User'
-                            
-                            viral_tweets.append({
-                                'account_name': name,
-                                'username': username,
-                                'tweet_id': tweet.id,
-                                'text': tweet.text,
-                                'created_at': tweet.created_at,
-                                'likes': metrics['like_count'],
-                                'retweets': metrics['retweet_count'],
-                                'replies': metrics['reply_count'],
-                                'url': f"https://twitter.com/{username}/status/{tweet.id}",
-                                'search_keyword': keyword
-                            })
+                        # ユーザー情報を取得
+                        user = self.user_cache.get(tweet.author_id)
+                        username = user['username'] if user else 'unknown'
+                        name = user['name'] if user else 'Unknown User'
+                        
+                        # 一致したキーワードに振り分け（判定できなければ先頭のキーワード）
+                        matched_keywords = match_keywords(tweet.text, keywords) or keywords[:1]
+                        fetched_tweets.append(
+                            TweetRecord.from_tweepy(tweet, username, name, ' / '.join(matched_keywords))
+                        )
+                    query_tweet_ids.extend(tweet.id for tweet in tweets.data)
+                
+                # 新しい順に取得するので、最後までページ送りできたときだけウォーターマークを進める
+                # （途中で打ち切ると、取得したページと前回の位置の間のツイートが取得されないままになる）
+                if next_token:
+                    print(f"検索ページ数の上限で途中まで取得: 次回も前回の位置から検索します ({query})")
+                else:
+                    self.watermarks.update('queries', query, query_tweet_ids)
                         
             except Exception as e:
-                print(f"Error searching for {keyword}: {e}")
+                print(f"Error searching for {query}: {e}")
                 continue
         
-        # 重複を削除（同じtweet_idは除外）
-        seen_ids = set()
-        unique_tweets = []
-        for tweet in viral_tweets:
-            if tweet['tweet_id'] not in seen_ids:
-                seen_ids.add(tweet['tweet_id'])
-                unique_tweets.append(tweet)
+        self.user_cache.save()
+        
+        # 前回までの取得分はエンゲージメントだけ更新して引き継ぐ
+        all_tweets = self.merge_with_recent('search', fetched_tweets, days_back)
         
-        # エンゲージメント順にソート
-        return sorted(unique_tweets, key=lambda x: x['likes'] + x['retweets'], reverse=True)
+        # 注目ツイート判定（いいね1以上 または RT1以上）し、エンゲージメント順にソート（重複はストアで排除済み）
+        return TweetBatch(all_tweets).where(likes=1, retweets=1).ranked()
 
     def get_viral_tweets(self, days_back=7):
-        """フォロワー自動検出と既存アカウントからツイート収集"""
-        viral_tweets = []
+        """フォロワー自動検出と既存アカウントからツイート収集（エンゲージメント順のリスト）"""
+        return TweetBatch(self.iter_viral_tweets(days_back)).ranked()
+    
+    def iter_viral_tweets(self, days_back=7):
+        """フォロワー自動検出と既存アカウントから収集した注目ツイートを、取得できた順に返すジェネレーター"""
         all_accounts = []
         
         # 1. 既存の指定アカウント
         all_accounts.extend(self.supporter_accounts)
         
-        # 2. 自動検出された活発なフォロワー
-        auto_followers = self.get_active_followers(limit=30)
-        all_accounts.extend(auto_followers)
+        # 2. 自動検出された活発なフォロワー（監視対象ごと、重複するアカウントは1回だけ取得）
+        for user_id in merge_values([target.user_id] for target in self.targets if target.user_id):
+            all_accounts.extend(self.get_active_followers(user_id))
+        all_accounts = merge_accounts([all_accounts])
         
         print(f"監視対象アカウント: {len(all_accounts)}名")
         
@@ -157,142 +239,236 @@ class TwitterSupporterAnalyzer:
         end_time = datetime.now() - timedelta(seconds=30)
         start_time = end_time - timedelta(days=days_back)
         
-        for i, account in enumerate(all_accounts):
+        # recent search は直近7日分しか検索できないので、それより前まで遡る場合や
+        # ユーザー名が分からないアカウントは1アカウントずつ取得する
+        if self.collection_mode == 'search' and days_back <= RECENT_SEARCH_DAYS:
+            search_accounts = [account for account in all_accounts if account.get('username')]
+        else:
+            search_accounts = []
+        timeline_accounts = [account for account in all_accounts if account not in search_accounts]
+        print(f"収集リクエスト: まとめて検索 {len(search_accounts)}名 / 個別取得 {len(timeline_accounts)}名")
+        
+        def fetch_batches():
+            # 同時実行数を制限して並列取得し、終わったリクエストから順に返す（間隔はRateLimiterが調整）
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                accounts_by_name = {account['username'].lower(): account for account in search_accounts}
+                futures = [
+                    executor.submit(
+                        self.fetch_accounts_by_search,
+                        query, [accounts_by_name[username.lower()] for username in usernames], start_time, days_back
+                    )
+                    for query, usernames in plan_account_queries(list(accounts_by_name))
+                ]
+                futures += [
+                    executor.submit(self.fetch_account_tweets, account, start_time, end_time, days_back)
+                    for account in timeline_accounts
+                ]
+                for future in as_completed(futures):
+                    yield future.result()
+        
+        # 前回までの取得分はエンゲージメントだけ更新して引き継ぐ
+        for tweet in self.iter_with_recent('timeline', fetch_batches(), days_back):
+            # より緩い条件でツイートを拾う
+            if tweet['likes'] >= 1 or tweet['retweets'] >= 1 or tweet['replies'] >= 2:
+                yield tweet
+        
+        print(f"レート制限待機: {self.rate_limiter.wait_count}回 / 合計{self.rate_limiter.throttled_seconds:.1f}秒")
+    
+    @metrics.timed('timeline_fetch')
+    def fetch_account_tweets(self, account, start_time, end_time, days_back=7):
+        """1アカウント分のツイートを取得（前回取得分より新しいもののみ）"""
+        account_tweets = []
+        try:
+            since_id = self.watermarks.get('accounts', account['user_id'])
+            if not is_within_window(since_id, days_back):
+                since_id = None
+            
+            tweets = self.twitter_client.get_users_tweets(
+                id=account['user_id'],
+                start_time=start_time,
+                end_time=end_time,
+                since_id=since_id,
+                tweet_fields=['public_metrics', 'created_at', 'author_id'],
+                max_results=10  # 少なめに設定
+            )
+            
+            if tweets.data:
+                for tweet in tweets.data:
+                    account_tweets.append(self.account_tweet_record(account, tweet))
+                self.watermarks.update('accounts', account['user_id'], [tweet.id for tweet in tweets.data])
+                    
+        except Exception as e:
+            print(f"Error fetching tweets for {account['name']}: {e}")
+        
+        return account_tweets
+    
+    @metrics.timed('account_search')
+    def fetch_accounts_by_search(self, query, accounts, start_time, days_back=7):
+        """from:でまとめた複数アカウントのツイートを検索し、アカウントごとに振り分け"""
+        import tweepy
+        
+        accounts = {str(account['user_id']): account for account in accounts}
+        account_tweets = []
+        try:
+            # 全アカウントのウォーターマークが期間内なら、最も古いものより新しいツイートだけを検索
+            watermarks = [self.watermarks.get('accounts', user_id) for user_id in accounts]
+            since_id = None
+            if watermarks and all(is_within_window(watermark, days_back) for watermark in watermarks):
+                since_id = min(watermarks, key=int)
+            
+            # recent search は7日より前を指定するとエラーになるので範囲内に収める
+            search_start = max(start_time, datetime.now() - timedelta(days=RECENT_SEARCH_DAYS, minutes=-1))
+            
+            pages = tweepy.Paginator(
+                self.twitter_client.search_recent_tweets,
+                query=query,
+                tweet_fields=['public_metrics', 'created_at', 'author_id'],
+                max_results=100,
+                since_id=since_id,
+                start_time=None if since_id else search_start,
+                limit=self.max_pages_per_query
+            )
+            
+            next_token = None
+            for tweets in pages:
+                next_token = (tweets.meta or {}).get('next_token')
+                for tweet in tweets.data or []:
+                    # 投稿者IDで元のアカウントに振り分け
+                    account = accounts.get(str(tweet.author_id))
+                    if account is not None:
+                        account_tweets.append(self.account_tweet_record(account, tweet))
+            
+            if next_token:
+                # ページ数の上限で打ち切った場合は、取得したページより古いツイートが残っているので
+                # どのアカウントのウォーターマークも進めない（次回も前回の位置から検索する）
+                print(f"ページ数の上限で途中まで取得: {len(accounts)}アカウントは次回も前回の位置から検索します")
+            else:
+                # 最後までページ送りできた場合は、まとめた全アカウントがそこまで取得済み
+                all_tweet_ids = [tweet['tweet_id'] for tweet in account_tweets]
+                for user_id in accounts:
+                    self.watermarks.update('accounts', user_id, all_tweet_ids)
+                    
+        except Exception as e:
+            print(f"Error searching tweets for {len(accounts)} accounts: {e}")
+        
+        return account_tweets
+    
+    def account_tweet_record(self, account, tweet):
+        """監視対象アカウントのツイートを共通の形式に変換"""
+        search_keyword = '自動検出フォロワー' if 'description' in account and '自動検出' in account['description'] else '指定アカウント'
+        return TweetRecord.from_tweepy(tweet, account['username'], account['name'], search_keyword)
+    
+    def merge_with_recent(self, source, fetched_tweets, days_back):
+        """今回の差分をストアに保存し、期間内の全ツイートを重複なしで返す"""
+        return list(self.iter_with_recent(source, [fetched_tweets], days_back))
+    
+    def iter_with_recent(self, source, fetched_batches, days_back):
+        """取得したバッチを順にストアに保存して返し、最後に前回までの取得分を返すジェネレーター"""
+        fetched_ids = set()
+        for tweets in fetched_batches:
+            self.tweet_store.upsert_tweets(source, tweets)
+            self.snapshot_store.record(tweets)
+            for tweet in tweets:
+                if tweet['tweet_id'] not in fetched_ids:
+                    fetched_ids.add(tweet['tweet_id'])
+                    yield tweet
+        self.watermarks.save()
+        
+        # 前回までの取得分はエンゲージメントだけ100件ずつ更新（間隔内に更新済みなら保存済みの値を使う）
+        refresh = self.should_refresh_engagement(source)
+        carried_count = 0
+        for chunk in self.tweet_store.iter_recent_chunks(source, days_back, chunk_size=100):
+            carried_tweets = [tweet for tweet in chunk if tweet['tweet_id'] not in fetched_ids]
+            if not carried_tweets:
+                continue
+            if refresh:
+                self.refresh_engagement(carried_tweets)
+                self.tweet_store.upsert_tweets(source, carried_tweets)
+                self.snapshot_store.record(carried_tweets)
+            carried_count += len(carried_tweets)
+            yield from carried_tweets
+        print(f"新規取得: {len(fetched_ids)}件 / 前回からの引き継ぎ: {carried_count}件")
+    
+    def should_refresh_engagement(self, source):
+        """前回の更新から engagement_refresh_interval 秒以上経っていればTrue（更新時刻を記録）"""
+        now = time.time()
+        if now - self._engagement_refreshed_at.get(source, 0) < self.engagement_refresh_interval:
+            return False
+        self._engagement_refreshed_at[source] = now
+        return True
+    
+    @metrics.timed('engagement_refresh')
+    def refresh_engagement(self, tweets):
+        """取得済みツイートのエンゲージメントを100件ずつまとめて更新"""
+        for i in range(0, len(tweets), 100):
+            chunk = tweets[i:i + 100]
             try:
-                # API制限回避のため間隔を空ける
-                if i > 0 and i % 5 == 0:
-                    import time
-                    time.sleep(2)
-                
-                tweets = self.twitter_client.get_users_tweets(
-                    id=account['user_id'],
-                    start_time=start_time,
-                    end_time=end_time,
-                    tweet_fields=['public_metrics', 'created_at', 'author_id'],
-                    max_results=10  # 少なめに設定
+                response = self.twitter_client.get_tweets(
+                    ids=[tweet['tweet_id'] for tweet in chunk],
+                    tweet_fields=['public_metrics']
                 )
-                
-                if tweets.data:
-                    for tweet in tweets.data:
-                        metrics = tweet.public_metrics
-                        # より緩い条件でツイートを拾う
-                        if metrics['like_count'] >= 1 or metrics['retweet_count'] >= 1 or metrics['reply_count'] >= 2:
-                            viral_tweets.append({
-                                'account_name': account['name'],
-                                'username': account['username'],
-                                'tweet_id': tweet.id,
-                                'text': tweet.text,
-                                'created_at': tweet.created_at,
-                                'likes': metrics['like_count'],
-                                'retweets': metrics['retweet_count'],
-                                'replies': metrics['reply_count'],
-                                'url': f"https://twitter.com/{account['username']}/status/{tweet.id}",
-                                'search_keyword': '自動検出フォロワー' if 'description' in account and '自動検出' in account['description'] else '指定アカウント'
-                            })
-                        
+                metrics_by_id = {tweet.id: tweet.public_metrics for tweet in response.data or []}
+                for tweet in chunk:
+                    metrics = metrics_by_id.get(tweet['tweet_id'])
+                    if metrics:
+                        tweet['likes'] = metrics['like_count']
+                        tweet['retweets'] = metrics['retweet_count']
+                        tweet['replies'] = metrics['reply_count']
             except Exception as e:
-                print(f"Error fetching tweets for {account['name']}: {e}")
-                continue
-        
-        # 重複を削除
-        seen_ids = set()
-        unique_tweets = []
-        for tweet in viral_tweets:
-            if tweet['tweet_id'] not in seen_ids:
-                seen_ids.add(tweet['tweet_id'])
-                unique_tweets.append(tweet)
-        
-        # エンゲージメント順にソート
-        return sorted(unique_tweets, key=lambda x: x['likes'] + x['retweets'], reverse=True)
+                print(f"エンゲージメント更新エラー: {e}")
     
     def filter_relevant_tweets(self, tweets):
-        """山田太郎議員関連キーワードでツイートをフィルタリング"""
-        yamada_keywords = [
-            '山田太郎', '表現の自由', '著作権', 'クリエイター', 'DX', 'デジタル',
-            '児童ポルノ', '児ポ', '非実在', '表現規制', 'CODA', 'TPP',
-            'コンテンツ', 'アニメ', 'マンガ', 'ゲーム', '同人', 'オタク',
-            'IT政策', 'デジタル庁', 'マイナンバー', 'サイバー', 'AI規制',
-            '参議院', '自民党', '政治', '議員', '政策', '法案'
-        ]
-        
-        relevant_tweets = []
-        for tweet in tweets:
-            text = tweet['text'].lower()
-            # キーワードマッチング
-            if any(keyword.lower() in text for keyword in yamada_keywords):
-                tweet['relevance_score'] = sum(1 for keyword in yamada_keywords if keyword.lower() in text)
-                relevant_tweets.append(tweet)
+        """監視対象の関連キーワードでツイートをフィルタリング"""
+        relevant_tweets = [tweet for tweet in tweets if self.score_relevance(tweet)]
         
         # 関連度順にソート
         relevant_tweets.sort(key=lambda x: x.get('relevance_score', 0), reverse=True)
         
         # 関連ツイートがない場合は元のリストを返す
         return relevant_tweets if relevant_tweets else tweets
+    
+    def score_relevance(self, tweet):
+        """関連キーワードを含むツイートに関連度と分野を付ける（関連ツイートならTrue）"""
+        return self.target.score_relevance(tweet)
 
-    def analyze_tweets_with_ai(self, tweets):
-        """AIでツイートを分析・要約"""
+    def analyze_tweets_with_ai(self, tweets, filtered=False):
+        """AIでツイートを分野別に分類し、レポートに載せるMarkdownの断片を返す（filtered=Trueならフィルタリング済みとして扱う）"""
         if not tweets:
-            return "本日はバイラルツイートはありませんでした。"
+            return ["本日はバイラルツイートはありませんでした。\n\n"]
         
         # 関連ツイートをフィルタリング
-        filtered_tweets = self.filter_relevant_tweets(tweets)
-        
-        # ツイート内容を整理
-        tweet_texts = []
-        for tweet in filtered_tweets[:20]:  # 上位20件を分析
-            relevance = f"(関連度: {tweet.get('relevance_score', 0)})" if 'relevance_score' in tweet else ""
-            tweet_texts.append(f"@{tweet['username']}: {tweet['text']} (👍{tweet['likes']} 🔄{tweet['retweets']}) {relevance}")
+        filtered_tweets = tweets if filtered else self.filter_relevant_tweets(tweets)
         
-        prompt = f"""以下は山田太郎議員に関連するツイートです。
-手動チェックの効率化のため、重要なツイートを分野別に分類してリストアップしてください。
-要約は不要です。元のツイート内容をそのまま残して分類してください。
-
-## 分野別ツイート一覧
-
-### 📝 表現の自由・規制関連
-（該当ツイートを元の文章のまま箇条書き）
-
-### 💻 デジタル・IT政策  
-（該当ツイートを元の文章のまま箇条書き）
-
-### 🎨 クリエイター・コンテンツ
-（該当ツイートを元の文章のまま箇条書き）
-
-### ⚖️ 法案・政策提案
-（該当ツイートを元の文章のまま箇条書き）
-
-### 🗳️ 政治活動・選挙
-（該当ツイートを元の文章のまま箇条書き）
-
-### 📊 その他
-（該当ツイートを元の文章のまま箇条書き）
-
-ツイート一覧：
-{chr(10).join(tweet_texts)}
-
-各ツイートを適切な分野に振り分けて、原文のまま表示してください。"""
-
+        # 全件を分割して並列に分類（前回分類済みのツイートはキャッシュを使う）
         try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=1000,
-                temperature=0.7
-            )
-            return response.choices[0].message.content
+            categories = self.tweet_classifier.classify(filtered_tweets)
         except Exception as e:
-            return f"AI分析エラー: {e}"
+            return [f"AI分析エラー: {e}\n\n"]
+        for tweet in filtered_tweets:
+            tweet['category'] = categories.get(tweet['tweet_id'], 'その他')
+        return iter_sections(filtered_tweets, categories)
     
-    def generate_report(self):
-        """レポートを生成"""
+    def generate_report(self, days_back=7, ranking='engagement'):
+        """レポートを生成（ranking='velocity' なら候補ツイートを直近の伸び順に表示）"""
+        if len(self.targets) > 1:
+            # 先頭の対象のレポートだけが書き出されるのを防ぐ
+            raise ValueError("監視対象が複数あるときは analysis_pipeline.py でレポートを生成してください")
+        metrics.reset()
         print("フォロワー自動検出でツイートを収集中...")
-        viral_tweets = self.get_viral_tweets()
+        viral_tweets = self.get_viral_tweets(days_back=days_back)
         
         print(f"{len(viral_tweets)}件のツイートを発見")
+        # 類似ツイートの合算・関連度判定の前に、収集したままの値をアーカイブに追記
+        self.tweet_archive.append(viral_tweets)
         
-        # 関連ツイートをフィルタリング
+        # ほぼ同じ本文のツイート（コピペ・引用の連鎖）は代表1件にまとめる
+        viral_tweets = collapse_near_duplicates(viral_tweets)
+        print(f"類似ツイート集約後: {len(viral_tweets)}件")
+        
+        # 関連ツイートをフィルタリング（関連度はストアに保存）
         relevant_tweets = self.filter_relevant_tweets(viral_tweets)
-        print(f"山田太郎議員関連: {len(relevant_tweets)}件")
+        self.tweet_store.update_relevance(relevant_tweets)
+        print(f"{self.target.name}関連: {len(relevant_tweets)}件")
         
         # キーワード別の内訳を表示
         keyword_counts = {}
@@ -305,11 +481,13 @@ class TwitterSupporterAnalyzer:
             print(f"  {keyword}: {count}件")
         
         print("AI分析を実行中...")
-        analysis = self.analyze_tweets_with_ai(viral_tweets)
+        analysis = self.analyze_tweets_with_ai(relevant_tweets, filtered=True)
         
-        # レポート生成
+        # レポート生成（本体と分野別・日別のレポートを断片ごとに書き出す）
         report_date = datetime.now().strftime('%Y-%m-%d')
-        report_content = f"""# 🔍 山田太郎議員関連ツイート拾い上げ
+        report_name = self.target.report_name(report_date)
+        title = f'支援者ツイート分析レポート - {report_date}'
+        header = f"""# 🔍 {self.target.name}関連ツイート拾い上げ
 ## {report_date}
 
 ### 📈 収集状況  
@@ -317,62 +495,44 @@ class TwitterSupporterAnalyzer:
 - 🎯 関連ツイート: {len(relevant_tweets)}件
 - 🚀 **リポスト・ウォッチ候補を効率的に発見**
 
-{analysis}
-
----
-
-## 🔥 リポスト・ウォッチ候補ツイート
-*エンゲージメントが高い順に表示（クリックでXへ移動）*
-
 """
-        
-        # 関連度の高いツイートを優先表示
-        display_tweets = relevant_tweets[:10] if relevant_tweets else viral_tweets[:10]
-        for tweet in display_tweets:
-            relevance_info = f"🎯**{tweet.get('relevance_score', 0)}点** " if 'relevance_score' in tweet else ""
-            keyword_info = f"📍 `{tweet.get('search_keyword', 'その他')}`"
-            report_content += f"""
-### 📱 [{tweet['account_name']}]({tweet['url']}) {relevance_info}
-**👍{tweet['likes']} 🔄{tweet['retweets']} 💬{tweet['replies']}** | {tweet['created_at'].strftime('%m/%d %H:%M')} | {keyword_info}
-
-> {tweet['text']}
+        candidates_heading = f"""---
 
-<blockquote class="twitter-tweet">
-<a href="{tweet['url']}">🔗 Xで原文を見る（リポスト可能）</a>
-</blockquote>
+## 🔥 リポスト・ウォッチ候補ツイート
+*{'直近の伸びが大きい' if ranking == 'velocity' else 'エンゲージメントが高い'}順に表示（クリックでXへ移動）*
 
----
 """
         
-        # reportsディレクトリを作成
-        os.makedirs('reports', exist_ok=True)
-        
-        # HTMLファイルとして保存
-        html_content = markdown.markdown(report_content)
-        
-        with open(f'reports/report_{report_date}.md', 'w', encoding='utf-8') as f:
-            f.write(report_content)
-        
-        with open(f'reports/report_{report_date}.html', 'w', encoding='utf-8') as f:
-            f.write(f"""<!DOCTYPE html>
-<html lang="ja">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>支援者ツイート分析レポート - {report_date}</title>
-    <style>
-        body {{ font-family: 'Hiragino Sans', 'Yu Gothic', sans-serif; max-width: 800px; margin: 0 auto; padding: 20px; }}
-        h1, h2, h3 {{ color: #333; }}
-        .tweet {{ background: #f5f5f5; padding: 15px; margin: 10px 0; border-radius: 8px; }}
-    </style>
-</head>
-<body>
-    {html_content}
-</body>
-</html>""")
-        
-        print(f"レポートを生成しました: reports/report_{report_date}.html")
-        return report_content
+        # 関連度の高いツイートを優先表示（上位はストアから取得）
+        relevant_only = any('relevance_score' in tweet for tweet in relevant_tweets)
+        thresholds = {'likes': 1, 'retweets': 1, 'replies': 2}
+        # 類似ツイートとしてまとめた分はストアの検索で除き、代表は合算後のエンゲージメントで表示
+        representatives = {tweet['tweet_id']: tweet for tweet in viral_tweets}
+        # 伸び順は条件を満たす全件を並べ替える（limit=-1 は上限なし）
+        candidates = [
+            representatives[tweet['tweet_id']]
+            for tweet in self.tweet_store.top_tweets(
+                'timeline', days_back, limit=-1 if ranking == 'velocity' else 10,
+                relevant_only=relevant_only, thresholds=thresholds, tweet_ids=representatives
+            )
+        ]
+        if ranking == 'velocity':
+            display_tweets = rank_by_velocity(candidates, self.snapshot_store.velocities(days_back), limit=10)
+        else:
+            display_tweets = candidates
+        
+        variant_links = write_variants(report_name, title, relevant_tweets)
+        html_path = write_report(
+            report_name, title, chain([header], analysis, [variant_links, candidates_heading]), display_tweets
+        )
+        print(f"レポートを生成しました: {html_path}")
+        index_report(report_name, title, html_path, relevant_tweets)
+        metrics.write_manifest(
+            f'reports/{report_name}.manifest.json',
+            report=report_name,
+            tweets={'viral': len(viral_tweets), 'relevant': len(relevant_tweets)}
+        )
+        return html_path
 
 if __name__ == "__main__":
     analyzer = TwitterSupporterAnalyzer()
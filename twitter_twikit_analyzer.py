@@ -1,27 +1,85 @@
 #!/usr/bin/env python3
 import asyncio
-from twikit import Client
 import json
 import os
+import time
 from datetime import datetime, timedelta
-import openai
-from openai import OpenAI
-import markdown
+from itertools import chain
+from watermark_store import WatermarkStore, is_within_window
+from tweet_store import TweetStore
+from snapshot_store import SnapshotStore
+from tweet_archive import TweetArchive
+from tweet_classifier import TweetClassifier, iter_sections
+from report_writer import write_report, write_variants
+from report_index import index_report
+from user_cache import UserCache
+from targets import load_targets, merge_values
+from instrumentation import metrics
+from tweet_record import TweetRecord, TweetBatch
 
 class TwitterTwikitAnalyzer:
-    def __init__(self):
+    def __init__(self, watermark_path='state/twikit_watermarks.json', store_path='state/tweets.db',
+                 max_concurrency=3, per_query_budget=100, max_retries=3, cookies_path=None,
+                 user_cache=None, client=None, openai_client=None, snapshot_store=None, engagement_refresh_interval=0,
+                 targets=None, tweet_archive=None):
+        # client / openai_client: 指定しなければ新しく作成（ベンチマークでは偽のクライアントを渡す）
+        # engagement_refresh_interval: 前回までの取得分のエンゲージメントを更新する最短間隔（秒、常駐モード用）
+        # targets: 監視対象の一覧（収集は全対象分をまとめて行う。generate_report は監視対象が1件のときだけ使える）
+        self.targets = targets or load_targets()
+        self.target = self.targets[0]
         self.openai_api_key = os.getenv('OPENAI_API_KEY')
-        self.openai_client = OpenAI(api_key=self.openai_api_key)
+        if openai_client is None:
+            from openai import OpenAI
+            openai_client = OpenAI(api_key=self.openai_api_key)
+        self.openai_client = openai_client
+        self.tweet_classifier = TweetClassifier(self.openai_client, subject='、'.join(target.name for target in self.targets))
         
         # Twitter認証情報（環境変数から取得）
         self.twitter_username = os.getenv('TWITTER_USERNAME')
         self.twitter_email = os.getenv('TWITTER_EMAIL')  
         self.twitter_password = os.getenv('TWITTER_PASSWORD')
         
-        self.client = Client('ja')
+        # ログインセッションの保存先（次回以降のログインを省略）
+        self.cookies_path = cookies_path or os.getenv('TWITTER_COOKIES_FILE', 'state/twikit_cookies.json')
         
+        if client is None:
+            from twikit import Client
+            client = Client('ja')
+        self.client = client
+        
+        # 同時リクエスト数・1クエリあたりの最大取得件数・429時の再試行回数
+        self.max_concurrency = max_concurrency
+        self.per_query_budget = per_query_budget
+        self.max_retries = max_retries
+        self._semaphore = None
+        self._cooldown_until = 0
+        self._backoff = 0
+        
+        # 差分取得用のウォーターマーク（前回取得した最大tweet_id）
+        self.watermarks = WatermarkStore(watermark_path)
+        
+        # 収集したツイートの保存先（実行をまたいで重複排除）
+        self.tweet_store = TweetStore(store_path)
+        
+        # 投稿者プロフィールのキャッシュ（API版と共有可能）
+        self.user_cache = user_cache if user_cache is not None else UserCache()
+        
+        # 実行ごとのエンゲージメントの記録（API版と共有可能）
+        self.snapshot_store = snapshot_store if snapshot_store is not None else SnapshotStore()
+        self.engagement_refresh_interval = engagement_refresh_interval
+        self._engagement_refreshed_at = 0
+        
+        # 収集したツイートを投稿日ごとに圧縮して残す（API版と共有可能）
+        self.tweet_archive = tweet_archive if tweet_archive is not None else TweetArchive()
+        
+    @metrics.timed('twikit_login')
     async def login_twitter(self):
-        """Twitterにログイン"""
+        """Twitterにログイン（保存済みセッションが有効ならそれを使う）"""
+        if await self.restore_session():
+            print("保存済みセッションでログイン")
+            self.save_session()
+            return True
+        
         try:
             await self.client.login(
                 auth_info_1=self.twitter_username,
@@ -29,33 +87,87 @@ class TwitterTwikitAnalyzer:
                 password=self.twitter_password
             )
             print("Twitterログイン成功")
+            self.save_session()
             return True
         except Exception as e:
             print(f"Twitterログインエラー: {e}")
             return False
     
-    async def search_tweets(self, query, count=50):
-        """キーワード検索でツイートを取得"""
+    async def restore_session(self):
+        """保存済みのCookieを読み込み、軽いリクエストで有効か確認"""
+        if not os.path.exists(self.cookies_path):
+            return False
+        try:
+            self.client.load_cookies(self.cookies_path)
+            await self.client.user_id()
+            return True
+        except Exception as e:
+            print(f"保存済みセッションが使えないため再ログインします: {e}")
+            self.client.set_cookies({}, clear_cookies=True)
+            return False
+    
+    def save_session(self):
+        """次回の実行用にCookieを保存（本人のみ読み書き可）"""
+        try:
+            os.makedirs(os.path.dirname(self.cookies_path) or '.', exist_ok=True)
+            self.client.save_cookies(self.cookies_path)
+            os.chmod(self.cookies_path, 0o600)
+        except Exception as e:
+            print(f"セッション保存エラー: {e}")
+    
+    async def request(self, func, *args, **kwargs):
+        """同時実行数を制限してリクエスト（429なら全体で待機してから再試行）"""
+        from twikit.errors import TooManyRequests
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        for attempt in range(self.max_retries + 1):
+            wait = self._cooldown_until - time.time()
+            if wait > 0:
+                metrics.count('twikit_rate_limit_waits')
+                metrics.count('twikit_rate_limit_wait_seconds', wait)
+                await asyncio.sleep(wait)
+            
+            async with self._semaphore:
+                try:
+                    metrics.count('twikit_api_calls')
+                    result = await func(*args, **kwargs)
+                    # 成功したら待機時間を徐々に戻す
+                    self._backoff /= 2
+                    return result
+                except TooManyRequests as e:
+                    metrics.count('twikit_rate_limited')
+                    if attempt == self.max_retries:
+                        raise
+                    # リセット時刻が分かればそこまで、なければ待機時間を倍にして待つ
+                    self._backoff = min(max(self._backoff * 2, 2), 300)
+                    resume_at = e.rate_limit_reset or time.time() + self._backoff
+                    self._cooldown_until = max(self._cooldown_until, resume_at)
+                    print(f"レート制限: {self._cooldown_until - time.time():.0f}秒待機します")
+    
+    @metrics.timed('twikit_search')
+    async def search_tweets(self, query, count=20, days_back=7):
+        """キーワード検索でツイートを取得（前回取得分より新しいもののみ、上限までページ送り）"""
         try:
             print(f"検索中: {query}")
-            tweets = await self.client.search_tweet(query, product='Latest', count=count)
+            since_id = self.watermarks.get('queries', query)
+            search_query = f"{query} since_id:{since_id}" if is_within_window(since_id, days_back) else query
+            page = await self.request(self.client.search_tweet, search_query, product='Latest', count=count)
+            
+            tweets = list(page)
+            while len(page) > 0 and len(tweets) < self.per_query_budget:
+                page = await self.request(page.next)
+                tweets.extend(page)
             
             tweet_data = []
-            for tweet in tweets:
-                # いいね1以上またはRT1以上のツイートのみ
-                if tweet.favorite_count >= 1 or tweet.retweet_count >= 1:
-                    tweet_data.append({
-                        'account_name': tweet.user.name,
-                        'username': tweet.user.screen_name,
-                        'tweet_id': tweet.id,
-                        'text': tweet.text,
-                        'created_at': tweet.created_at,
-                        'likes': tweet.favorite_count,
-                        'retweets': tweet.retweet_count,
-                        'replies': tweet.reply_count or 0,
-                        'url': f"https://twitter.com/{tweet.user.screen_name}/status/{tweet.id}",
-                        'search_keyword': query
-                    })
+            for tweet in tweets[:self.per_query_budget]:
+                tweet_data.append(TweetRecord.from_twikit(tweet, query))
+            # 新しい順に取得するので、空のページまで読み切ったときだけウォーターマークを進める
+            # （上限で打ち切ると、取得した分と前回の位置の間のツイートが取得されないままになる）
+            if len(page) == 0:
+                self.watermarks.update('queries', query, [tweet['tweet_id'] for tweet in tweet_data])
+            else:
+                print(f"取得件数の上限で途中まで取得: 次回も前回の位置から検索します ({query})")
             
             print(f"{query}: {len(tweet_data)}件取得")
             return tweet_data
@@ -64,28 +176,26 @@ class TwitterTwikitAnalyzer:
             print(f"検索エラー ({query}): {e}")
             return []
     
+    @metrics.timed('twikit_user_tweets')
     async def get_user_tweets(self, username, count=20):
-        """指定ユーザーのツイートを取得"""
+        """指定ユーザーのツイートを取得（前回取得分より新しいもののみ）"""
         try:
             print(f"ユーザーツイート取得中: @{username}")
-            user = await self.client.get_user_by_screen_name(username)
-            tweets = await user.get_tweets('Tweets', count=count)
+            # ユーザーIDがキャッシュにあればユーザー検索を省略
+            profile = self.user_cache.get_by_username(username)
+            if profile is None:
+                user = await self.request(self.client.get_user_by_screen_name, username)
+                profile = self.user_cache.put(user.id, user.screen_name, user.name, followers=user.followers_count)
+            tweets = await self.request(self.client.get_user_tweets, profile['id'], 'Tweets', count=count)
             
+            # タイムラインはsince_idを指定できないので取得済みの分を除外
+            since_id = self.watermarks.get('accounts', username)
             tweet_data = []
             for tweet in tweets:
-                if tweet.favorite_count >= 1 or tweet.retweet_count >= 1:
-                    tweet_data.append({
-                        'account_name': tweet.user.name,
-                        'username': tweet.user.screen_name,
-                        'tweet_id': tweet.id,
-                        'text': tweet.text,
-                        'created_at': tweet.created_at,
-                        'likes': tweet.favorite_count,
-                        'retweets': tweet.retweet_count,
-                        'replies': tweet.reply_count or 0,
-                        'url': f"https://twitter.com/{tweet.user.screen_name}/status/{tweet.id}",
-                        'search_keyword': f'@{username}'
-                    })
+                if since_id is not None and int(tweet.id) <= int(since_id):
+                    continue
+                tweet_data.append(TweetRecord.from_twikit(tweet, f'@{username}'))
+            self.watermarks.update('accounts', username, [tweet['tweet_id'] for tweet in tweet_data])
             
             print(f"@{username}: {len(tweet_data)}件取得")
             return tweet_data
@@ -94,94 +204,95 @@ class TwitterTwikitAnalyzer:
             print(f"ユーザーツイート取得エラー (@{username}): {e}")
             return []
     
-    async def collect_all_tweets(self):
-        """全てのツイートを収集"""
-        all_tweets = []
-        
-        # 1. キーワード検索
-        search_queries = [
-            '山田太郎 議員',
-            '山田太郎 参議院',
-            '表現の自由 山田太郎',
-            '著作権 山田太郎',
-            'クリエイター 山田太郎'
-        ]
-        
-        for query in search_queries:
-            tweets = await self.search_tweets(query, count=30)
-            all_tweets.extend(tweets)
-            await asyncio.sleep(2)  # レート制限回避
+    async def collect_all_tweets(self, days_back=7):
+        """全てのツイートを収集（エンゲージメント順のリスト）"""
+        return TweetBatch([tweet async for tweet in self.iter_all_tweets(days_back)]).ranked()
+    
+    async def iter_all_tweets(self, days_back=7):
+        """収集した注目ツイートを、取得できたリクエストから順に返す非同期ジェネレーター"""
+        # 1. キーワード検索（全監視対象のクエリを重複なしでまとめる）
+        search_queries = merge_values(target.twikit_queries for target in self.targets)
         
         # 2. 重要アカウントの直接取得
-        important_users = [
-            'yamadataro43',  # 山田太郎議員
-        ]
+        important_users = merge_values(target.important_users for target in self.targets)
         
-        for username in important_users:
-            tweets = await self.get_user_tweets(username, count=50)
-            all_tweets.extend(tweets)
-            await asyncio.sleep(2)
-        
-        # 重複削除
-        seen_ids = set()
-        unique_tweets = []
-        for tweet in all_tweets:
-            if tweet['tweet_id'] not in seen_ids:
-                seen_ids.add(tweet['tweet_id'])
-                unique_tweets.append(tweet)
+        # 検索とユーザーツイート取得を並行実行（間隔はrequestで調整）
+        tasks = [
+            *(asyncio.ensure_future(self.search_tweets(query, days_back=days_back)) for query in search_queries),
+            *(asyncio.ensure_future(self.get_user_tweets(username, count=50)) for username in important_users)
+        ]
+        fetched_ids = set()
+        for task in asyncio.as_completed(tasks):
+            tweets = await task
+            # 今回の差分をストアに保存（重複はtweet_idで排除）
+            self.tweet_store.upsert_tweets('twikit', tweets)
+            self.snapshot_store.record(tweets)
+            for tweet in tweets:
+                if tweet['tweet_id'] in fetched_ids:
+                    continue
+                fetched_ids.add(tweet['tweet_id'])
+                # いいね1以上またはRT1以上のツイートのみ
+                if tweet['likes'] >= 1 or tweet['retweets'] >= 1:
+                    yield tweet
+        self.user_cache.save()
+        self.watermarks.save()
         
-        # エンゲージメント順にソート
-        return sorted(unique_tweets, key=lambda x: x['likes'] + x['retweets'], reverse=True)
+        # 前回までの取得分はエンゲージメントだけ100件ずつ更新して引き継ぐ（間隔内に更新済みなら保存済みの値を使う）
+        refresh = time.time() - self._engagement_refreshed_at >= self.engagement_refresh_interval
+        if refresh:
+            self._engagement_refreshed_at = time.time()
+        carried_count = 0
+        for chunk in self.tweet_store.iter_recent_chunks('twikit', days_back, chunk_size=100):
+            carried_tweets = [tweet for tweet in chunk if tweet['tweet_id'] not in fetched_ids]
+            if not carried_tweets:
+                continue
+            if refresh:
+                await self.refresh_engagement(carried_tweets)
+                self.tweet_store.upsert_tweets('twikit', carried_tweets)
+                self.snapshot_store.record(carried_tweets)
+            carried_count += len(carried_tweets)
+            for tweet in carried_tweets:
+                if tweet['likes'] >= 1 or tweet['retweets'] >= 1:
+                    yield tweet
+        print(f"新規取得: {len(fetched_ids)}件 / 前回からの引き継ぎ: {carried_count}件")
+    
+    @metrics.timed('twikit_engagement_refresh')
+    async def refresh_engagement(self, tweets):
+        """取得済みツイートのエンゲージメントをまとめて更新"""
+        for i in range(0, len(tweets), 100):
+            chunk = tweets[i:i + 100]
+            try:
+                refreshed = await self.request(self.client.get_tweets_by_ids, [str(tweet['tweet_id']) for tweet in chunk])
+                tweets_by_id = {int(tweet.id): tweet for tweet in refreshed if tweet is not None}
+                for tweet in chunk:
+                    latest = tweets_by_id.get(tweet['tweet_id'])
+                    if latest:
+                        tweet['likes'] = latest.favorite_count
+                        tweet['retweets'] = latest.retweet_count
+                        tweet['replies'] = latest.reply_count or 0
+            except Exception as e:
+                print(f"エンゲージメント更新エラー: {e}")
     
     def analyze_tweets_with_ai(self, tweets):
-        """AIでツイートを分析"""
+        """AIでツイートを分野別に分類し、レポートに載せるMarkdownの断片を返す"""
         if not tweets:
-            return "ツイートが見つかりませんでした。"
+            return ["ツイートが見つかりませんでした。\n\n"]
         
-        # 上位20件を分析
-        tweet_texts = []
-        for tweet in tweets[:20]:
-            tweet_texts.append(f"@{tweet['username']}: {tweet['text']} (👍{tweet['likes']} 🔄{tweet['retweets']})")
-        
-        prompt = f"""以下は山田太郎議員に関連するツイートです。
-分野ごとに整理して、リポスト・ウォッチ候補として分類してください。
-
-## 分野別ツイート一覧
-
-### 📝 表現の自由・規制関連
-（該当ツイートを元の文章のまま箇条書き）
-
-### 💻 デジタル・IT政策  
-（該当ツイートを元の文章のまま箇条書き）
-
-### 🎨 クリエイター・コンテンツ
-（該当ツイートを元の文章のまま箇条書き）
-
-### ⚖️ 法案・政策提案
-（該当ツイートを元の文章のまま箇条書き）
-
-### 🗳️ 政治活動・選挙
-（該当ツイートを元の文章のまま箇条書き）
-
-### 📊 その他
-（該当ツイートを元の文章のまま箇条書き）
-
-ツイート一覧：
-{chr(10).join(tweet_texts)}"""
-
+        # 全件を分割して並列に分類（前回分類済みのツイートはキャッシュを使う）
         try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=1000,
-                temperature=0.7
-            )
-            return response.choices[0].message.content
+            categories = self.tweet_classifier.classify(tweets)
         except Exception as e:
-            return f"AI分析エラー: {e}"
+            return [f"AI分析エラー: {e}\n\n"]
+        for tweet in tweets:
+            tweet['category'] = categories.get(tweet['tweet_id'], 'その他')
+        return iter_sections(tweets, categories)
     
     async def generate_report(self):
         """レポート生成のメイン処理"""
+        if len(self.targets) > 1:
+            # 先頭の対象のレポートだけが書き出されるのを防ぐ
+            raise ValueError("監視対象が複数あるときは analysis_pipeline.py でレポートを生成してください")
+        metrics.reset()
         print("=== Twikit版 Twitter分析開始 ===")
         
         # Twitterログイン
@@ -193,23 +304,26 @@ class TwitterTwikitAnalyzer:
         print("ツイート収集中...")
         all_tweets = await self.collect_all_tweets()
         print(f"総取得数: {len(all_tweets)}件")
+        # 収集したままの値をアーカイブに追記
+        self.tweet_archive.append(all_tweets)
         
         # AI分析
         print("AI分析中...")
         analysis = self.analyze_tweets_with_ai(all_tweets)
         
-        # レポート生成
+        # レポート生成（本体と分野別・日別のレポートを断片ごとに書き出す）
         report_date = datetime.now().strftime('%Y-%m-%d')
-        report_content = f"""# 🔍 山田太郎議員関連ツイート拾い上げ (Twikit版)
+        report_name = self.target.report_name(report_date, prefix='twikit_report')
+        title = f'{self.target.name}ツイート分析 - {report_date}'
+        header = f"""# 🔍 {self.target.name}関連ツイート拾い上げ (Twikit版)
 ## {report_date}
 
 ### 📈 収集状況  
 - 📊 取得ツイート総数: {len(all_tweets)}件
 - 🚀 **API制限なしで大量取得成功**
 
-{analysis}
-
----
+"""
+        candidates_heading = """---
 
 ## 🔥 リポスト・ウォッチ候補ツイート
 *エンゲージメントが高い順に表示*
@@ -217,45 +331,21 @@ class TwitterTwikitAnalyzer:
 """
         
         # 上位20件の詳細表示
-        for tweet in all_tweets[:20]:
-            report_content += f"""
-### 📱 [{tweet['account_name']}]({tweet['url']})
-**👍{tweet['likes']} 🔄{tweet['retweets']} 💬{tweet['replies']}** | {tweet['created_at'].strftime('%m/%d %H:%M') if hasattr(tweet['created_at'], 'strftime') else tweet['created_at']} | 📍 `{tweet['search_keyword']}`
-
-> {tweet['text']}
-
-<a href="{tweet['url']}">🔗 Xで原文を見る（リポスト可能）</a>
-
----
-"""
-        
-        # ファイル出力
-        os.makedirs('reports', exist_ok=True)
-        
-        with open(f'reports/twikit_report_{report_date}.md', 'w', encoding='utf-8') as f:
-            f.write(report_content)
-        
-        # HTML版も生成
-        html_content = markdown.markdown(report_content)
-        with open(f'reports/twikit_report_{report_date}.html', 'w', encoding='utf-8') as f:
-            f.write(f"""<!DOCTYPE html>
-<html lang="ja">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>山田太郎議員ツイート分析 - {report_date}</title>
-    <style>
-        body {{ font-family: 'Hiragino Sans', 'Yu Gothic', sans-serif; max-width: 800px; margin: 0 auto; padding: 20px; }}
-        h1, h2, h3 {{ color: #333; }}
-        blockquote {{ background: #f5f5f5; padding: 10px; border-left: 4px solid #ddd; }}
-    </style>
-</head>
-<body>
-    {html_content}
-</body>
-</html>""")
+        display_tweets = self.tweet_store.top_tweets(
+            'twikit', 7, limit=20, thresholds={'likes': 1, 'retweets': 1}
+        )
         
-        print(f"Twikitレポートを生成しました: reports/twikit_report_{report_date}.html")
+        variant_links = write_variants(report_name, title, all_tweets)
+        html_path = write_report(
+            report_name, title, chain([header], analysis, [variant_links, candidates_heading]), display_tweets
+        )
+        print(f"Twikitレポートを生成しました: {html_path}")
+        index_report(report_name, title, html_path, all_tweets)
+        metrics.write_manifest(
+            f'reports/{report_name}.manifest.json',
+            report=report_name,
+            tweets={'collected': len(all_tweets)}
+        )
 
 if __name__ == "__main__":
     analyzer = TwitterTwikitAnalyzer()
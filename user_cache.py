@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+import json
+import os
+import threading
+import time
+
+
+class UserCache:
+    """ユーザーID・スクリーンネーム → プロフィールのキャッシュ（メモリとファイル）"""
+
+    def __init__(self, path='state/user_cache.json', ttl_days=7):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self._lock = threading.Lock()
+        self.users = self.load()
+        self.user_ids = {profile['username'].lower(): user_id for user_id, profile in self.users.items()}
+
+    def load(self):
+        """保存済みのプロフィールを読み込み（期限切れは除外）"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                users = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        now = time.time()
+        return {user_id: profile for user_id, profile in users.items() if profile['cached_at'] + self.ttl > now}
+
+    def save(self):
+        """キャッシュをファイルに書き出し"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.users, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def get(self, user_id):
+        """ユーザーIDでプロフィールを取得（なければNone）"""
+        profile = self.users.get(str(user_id))
+        if profile is None or profile['cached_at'] + self.ttl <= time.time():
+            return None
+        return profile
+
+    def get_by_username(self, username):
+        """スクリーンネームでプロフィールを取得（なければNone）"""
+        user_id = self.user_ids.get(username.lower())
+        return self.get(user_id) if user_id else None
+
+    def put(self, user_id, username, name, **extra):
+        """プロフィールを登録（followersなどの追加項目も保存）"""
+        profile = dict(extra, id=str(user_id), username=username, name=name, cached_at=time.time())
+        with self._lock:
+            self.users[str(user_id)] = profile
+            self.user_ids[username.lower()] = str(user_id)
+        return profile
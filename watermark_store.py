@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+
+class WatermarkStore:
+    """アカウント・検索クエリごとの取得済み最大tweet_idを保存"""
+
+    def __init__(self, path='state/watermarks.json'):
+        self.path = path
+        self._lock = threading.Lock()
+        self.data = self.load()
+
+    def load(self):
+        """保存済みのウォーターマークを読み込み"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            data = {}
+        data.setdefault('accounts', {})
+        data.setdefault('queries', {})
+        return data
+
+    def save(self):
+        """ウォーターマークをファイルに書き出し"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def get(self, kind, key):
+        """前回までに取得した最大tweet_id（未取得ならNone）"""
+        return self.data[kind].get(key)
+
+    def update(self, kind, key, tweet_ids):
+        """取得したtweet_idでウォーターマークを進める"""
+        tweet_ids = [int(tweet_id) for tweet_id in tweet_ids]
+        if not tweet_ids:
+            return
+        with self._lock:
+            current = self.data[kind].get(key)
+            newest = max(tweet_ids)
+            if current is None or newest > int(current):
+                self.data[kind][key] = str(newest)
+
+
+def snowflake_time(tweet_id):
+    """tweet_id（Snowflake ID）から投稿日時を求める"""
+    return datetime.fromtimestamp(((int(tweet_id) >> 22) + 1288834974657) / 1000, tz=timezone.utc)
+
+
+def is_within_window(tweet_id, days_back):
+    """ウォーターマークが取得期間内か（古すぎるsince_idは使わない）"""
+    if tweet_id is None:
+        return False
+    return snowflake_time(tweet_id) >= datetime.now(timezone.utc) - timedelta(days=days_back)